@@ -0,0 +1,56 @@
+from time import time
+
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.opt2 import feas_algorithm
+from retiming.RetimedGraphView import RetimedGraphView
+from utils.retiming_utils import compute_retimed_graph, draw_retiming_graph
+
+
+def anytime_algorithm(graph, time_budget, tolerance=1e-6, draw=False, verbose=False):
+    """
+    Anytime clock minimization within a time budget, for graphs where an exact OPT1 / OPT2 run is not affordable.
+    It needs neither W nor D:
+    1) the zero retiming is feasible, so the clock period of the graph is an upper bound; the largest delay is a
+       lower bound, since every vertex is a combinational path by itself
+    2) the gap is bisected with FEAS: a feasible clock gives a better retiming and its clock period becomes the upper
+       bound, an infeasible one (FEAS is exact) proves that the optimum is larger
+    3) when the budget runs out, also in the middle of a FEAS run, the best retiming found so far is returned
+    With integer delays every clock period is an integer, so bisection runs on integers and closes the gap exactly
+    :param graph: directed retiming graph
+    :param time_budget: time budget in seconds
+    :param tolerance: gap under which the search stops for non integer delays
+    :param draw: True if we want to draw the retimed graph
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: best retimed graph, its clock period and a proven lower bound of the optimal clock period
+    """
+    deadline = time() + time_budget
+    delays = [delay for _, delay in graph.nodes(data="delay")]
+    integral = all(float(delay).is_integer() for delay in delays)
+
+    # 1) Initial bounds
+    best_retiming = {v: 0 for v in graph.nodes}
+    upper_bound = cp_algorithm(graph)
+    lower_bound = max(delays)
+
+    # 2) Bisect the gap with FEAS until it is closed or the budget is over
+    while upper_bound - lower_bound > (0 if integral else tolerance):
+        clock = (lower_bound + upper_bound) // 2 if integral else (lower_bound + upper_bound) / 2
+        try:
+            retiming = feas_algorithm(graph, clock, deadline=deadline)
+        except TimeoutError:
+            break
+        if retiming is None:
+            # The optimum is larger than clock (and, with integer delays, at least clock + 1)
+            lower_bound = clock + 1 if integral else clock
+        else:
+            best_retiming = retiming
+            upper_bound = cp_algorithm(RetimedGraphView(graph, retiming))
+        if verbose:
+            print(f"Optimal clock period in [{lower_bound}, {upper_bound}]")
+
+    G_r = compute_retimed_graph(graph, best_retiming)
+    if verbose:
+        print(f"Best clock period {upper_bound}, optimality gap {upper_bound - lower_bound}")
+    if draw:
+        draw_retiming_graph(G_r)
+    return G_r, upper_bound, lower_bound
@@ -0,0 +1,114 @@
+import networkx as nx
+import numpy as np
+
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.path_engines import edge_arrays, negative_cycle
+from algorithms.wd_algorithm import lexicographic_graph, paper_wd_algorithm
+from retiming.RetimedGraphView import RetimedGraphView
+
+
+def retiming_certificate(graph, retiming, clock):
+    """
+    Certificate of an optimal retiming, checkable with verify_certificate without solving anything:
+    1) upper bound: the retiming itself, which must be legal and have clock period <= clock
+    2) lower bound: a negative cycle of the constraint graph of the clocks smaller than clock, i.e. with the type 2
+       constraints of the pairs with D(u, v) >= clock (those of the next smaller candidate clock). Every constraint of
+       the cycle is given with the graph path it comes from:
+       - an edge u -> v, for r(u) - r(v) <= w(e)
+       - a path p from u to v with d(p) >= clock, for r(u) - r(v) <= w(p) - 1, since with a smaller clock p needs a
+         register
+       Summing the constraints along the cycle gives 0 <= negative number, so no smaller clock is feasible
+    The constraints use D as defined in the paper (see paper_wd_algorithm), so that the cycle exists whenever clock
+    is truly optimal
+    :param graph: directed retiming graph
+    :param retiming: retiming dictionary found for clock
+    :param clock: optimal clock period
+    :return: certificate dictionary with clock, retiming, lower_clock (next smaller candidate clock, None if there is
+             none) and negative_cycle (list of {'path', 'strict'} constraints, None if a smaller clock is feasible, i.e.
+             clock is not optimal)
+    """
+    w_mat, d_mat = paper_wd_algorithm(graph)
+    candidates = np.unique(d_mat[~np.isnan(d_mat)])
+    smaller = candidates[candidates < clock]
+    tails, heads, weights, _ = edge_arrays(graph)
+    pairs_u, pairs_v = np.nonzero(d_mat >= clock)
+    # Constraint r(u) - r(v) <= b is the edge v -> u of length b in the constraint graph
+    cycle = negative_cycle(len(graph.nodes), np.concatenate((heads, pairs_v)), np.concatenate((tails, pairs_u)),
+                           np.concatenate((weights, w_mat[pairs_u, pairs_v] - 1)))
+    constraints = None
+    if cycle is not None:
+        lex_graph = lexicographic_graph(graph)[0]
+        constraints = []
+        for index in cycle:
+            if index < len(tails):
+                constraints.append({"path": [int(tails[index]), int(heads[index])], "strict": False})
+            else:
+                # The lexicographic shortest path has W(u, v) registers and delay D(u, v)
+                u, v = int(pairs_u[index - len(tails)]), int(pairs_v[index - len(tails)])
+                path = [u] if u == v else nx.dijkstra_path(lex_graph, u, v, weight="lex")
+                constraints.append({"path": [int(x) for x in path], "strict": True})
+    return {"clock": clock, "retiming": dict(retiming), "lower_clock": smaller[-1].item() if len(smaller) else None,
+            "negative_cycle": constraints}
+
+
+def _check_upper_bound(graph, certificate):
+    """
+    The certified retiming is legal (w_r(e) >= 0, vectorized over the edges) and its clock period is <= clock
+    """
+    G_r = RetimedGraphView(graph, certificate["retiming"])
+    if not G_r.is_legal:
+        return False, "the retiming makes some edge weight negative"
+    try:
+        clock = cp_algorithm(G_r)
+    except nx.NetworkXUnfeasible:
+        return False, "the retimed graph has a cycle with 0 weight"
+    if clock > certificate["clock"]:
+        return False, f"the retimed graph has clock period {clock} > {certificate['clock']}"
+    return True, "upper bound verified"
+
+
+def _check_lower_bound(graph, certificate):
+    """
+    The certified constraints exist, close a cycle and sum to a negative bound
+    """
+    clock, constraints = certificate["clock"], certificate["negative_cycle"]
+    if constraints is None:
+        return False, "missing negative cycle, a smaller clock period is feasible"
+    total = 0
+    for index, constraint in enumerate(constraints):
+        path = constraint["path"]
+        if not all(graph.has_edge(u, v) for u, v in zip(path, path[1:])):
+            return False, f"constraint {index} is not a path of the graph"
+        weight = sum(graph[u][v]["weight"] for u, v in zip(path, path[1:]))
+        if constraint["strict"]:
+            if sum(graph.nodes[v]["delay"] for v in path) < clock:
+                return False, f"constraint {index} comes from a path faster than the clock"
+            total += weight - 1
+        elif len(path) != 2:
+            return False, f"constraint {index} is not an edge"
+        else:
+            total += weight
+        # r(u) - r(v) constraints must chain: the v of a constraint is the u of the previous one
+        if path[-1] != constraints[index - 1]["path"][0]:
+            return False, f"constraint {index} does not follow constraint {index - 1}"
+    if total >= 0:
+        return False, "the constraint cycle is not negative"
+    return True, "lower bound verified"
+
+
+def verify_certificate(graph, certificate, verbose=False):
+    """
+    Check a certificate from retiming_certificate in time linear in the size of the graph and of the certificate,
+    without running WD nor any solver
+    :param graph: directed retiming graph the certificate refers to
+    :param certificate: certificate dictionary
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: True if the retiming reaches the clock and no smaller clock is feasible
+    """
+    for check in (_check_upper_bound, _check_lower_bound):
+        valid, message = check(graph, certificate)
+        if verbose:
+            print(f"Certificate for clock period {certificate['clock']}: {message}")
+        if not valid:
+            return False
+    return True
@@ -0,0 +1,96 @@
+import numpy as np
+
+from algorithms.path_engines import bellman_ford_potentials, edge_arrays
+from algorithms.wd_algorithm import wd_algorithm
+
+
+def _register_count(graph_weight, retiming, degree_balance):
+    """
+    Number of registers of a retimed graph: sum of w_r(u, v) = w(u, v) + r(v) - r(u) over the edges, that is
+    sum(w) + sum(r(v) * (indegree(v) - outdegree(v)))
+    """
+    return int(round(graph_weight + retiming @ degree_balance))
+
+
+def clock_sweep(graph, clocks, w_mat=None, d_mat=None, verbose=False):
+    """
+    Feasibility of a whole set of target clocks in one session, instead of one check_legal_retiming per clock:
+    1) W and D are computed once, and the pairs (u, v) are sorted once by decreasing D(u, v), so that the type 2
+       constraints r(u) - r(v) <= W(u, v) - 1 of a clock c are a prefix of that list (the pairs with D(u, v) > c)
+    2) clocks are processed from the largest one: the constraint set only grows as the clock decreases, so the
+       Bellman-Ford potentials of a clock are a warm start for the next one and give the same shortest distances
+    3) once a clock is infeasible every smaller one is, so they are answered without solving anything
+    The retiming of a feasible clock is the same one check_legal_retiming returns
+    :param graph: directed retiming graph
+    :param clocks: iterable of target clock periods
+    :param w_mat: W matrix, if already computed with WD algorithm
+    :param d_mat: D matrix, if already computed with WD algorithm
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: dictionary {clock: {'feasible', 'retiming', 'registers'}}, retiming and registers are None if infeasible
+    """
+    # 1) Shared matrices and constraint lists
+    if w_mat is None or d_mat is None:
+        w_mat, d_mat = wd_algorithm(graph, verbose=verbose)
+    n_nodes = len(graph.nodes)
+    tails, heads, weights, _ = edge_arrays(graph)
+    degree_balance = np.bincount(heads, minlength=n_nodes) - np.bincount(tails, minlength=n_nodes)
+    total_weight = weights.sum()
+
+    pairs_u, pairs_v = np.nonzero(~np.isnan(d_mat))
+    order = np.argsort(-d_mat[pairs_u, pairs_v], kind="stable")
+    pairs_u, pairs_v = pairs_u[order], pairs_v[order]
+    pairs_d = d_mat[pairs_u, pairs_v]
+    # Constraint r(u) - r(v) <= b is the edge v -> u of length b in the constraint graph
+    constraint_tails = np.concatenate((heads, pairs_v))
+    constraint_heads = np.concatenate((tails, pairs_u))
+    constraint_lengths = np.concatenate((weights, w_mat[pairs_u, pairs_v] - 1))
+
+    # 2) Largest clocks first, warm starting from the previous potentials
+    results = {}
+    dist, infeasible = None, False
+    for clock in sorted(set(clocks), reverse=True):
+        if infeasible:
+            # 3) A clock smaller than an infeasible one is infeasible
+            results[clock] = {"feasible": False, "retiming": None, "registers": None}
+            continue
+        n_active = len(weights) + np.count_nonzero(pairs_d > clock)
+        solution, feasible = bellman_ford_potentials(n_nodes, constraint_tails[:n_active],
+                                                     constraint_heads[:n_active], constraint_lengths[:n_active],
+                                                     dist=dist)
+        if feasible:
+            dist = solution
+            retiming = dist.astype(int)
+            results[clock] = {"feasible": True, "retiming": dict(enumerate(retiming.tolist())),
+                              "registers": _register_count(total_weight, retiming, degree_balance)}
+        else:
+            infeasible = True
+            results[clock] = {"feasible": False, "retiming": None, "registers": None}
+        if verbose:
+            print(f"Clock period {clock}: " + (f"feasible with {results[clock]['registers']} registers"
+                                               if feasible else "infeasible"))
+    return results
+
+
+def clock_register_pareto(graph, clocks=None, w_mat=None, d_mat=None, verbose=False):
+    """
+    Clock period versus number of registers trade-off: the feasible clocks of a sweep whose retiming uses fewer
+    registers than the one of every smaller clock. The retimings are the Bellman-Ford ones of OPT1, not minimum
+    register ones, so the curve describes what OPT1 would produce for each target
+    :param graph: directed retiming graph
+    :param clocks: target clock periods, None for every distinct value of D (the only candidate optimal clocks)
+    :param w_mat: W matrix, if already computed with WD algorithm
+    :param d_mat: D matrix, if already computed with WD algorithm
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: list of (clock, registers, retiming) tuples sorted by increasing clock
+    """
+    if w_mat is None or d_mat is None:
+        w_mat, d_mat = wd_algorithm(graph, verbose=verbose)
+    if clocks is None:
+        clocks = np.unique(d_mat[~np.isnan(d_mat)]).tolist()
+    sweep = clock_sweep(graph, clocks, w_mat=w_mat, d_mat=d_mat, verbose=verbose)
+    front = []
+    for clock in sorted(sweep):
+        result = sweep[clock]
+        if result["feasible"] and (not front or result["registers"] < front[-1][1]):
+            front.append((clock, result["registers"], result["retiming"]))
+    return front
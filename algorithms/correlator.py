@@ -0,0 +1,147 @@
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.opt1 import opt1_retiming
+from utils.retiming_utils import compute_retimed_graph, draw_retiming_graph
+
+
+def is_correlator_shaped(graph):
+    """
+    Check the structure RetimingGraph builds with remove_clockwise_edges: nodes 0, ..., n-1, every edge goes forward
+    (u < v) except a single feedback edge from the last node to the first one
+    :param graph: directed retiming graph
+    :return: True | False
+    """
+    n_nodes = len(graph.nodes)
+    if n_nodes < 2 or set(graph.nodes) != set(range(n_nodes)):
+        return False
+    backward_edges = [(u, v) for u, v in graph.edges if u >= v]
+    return backward_edges == [(n_nodes - 1, 0)]
+
+
+class _CorrelatorSolver:
+    def __init__(self, graph):
+        """
+        Precomputed structure of a correlator shaped graph: the forward edges form a DAG whose topological order is
+        0, ..., n-1, and every cycle goes through the feedback edge t = n-1 -> s = 0
+        """
+        n_nodes = len(graph.nodes)
+        self.delays = [graph.nodes[v]["delay"] for v in range(n_nodes)]
+        self.feedback_weight = graph[n_nodes - 1][0]["weight"]
+        self.predecessors = [[] for _ in range(n_nodes)]
+        self.successors = [[] for _ in range(n_nodes)]
+        for u, v, weight in graph.edges(data="weight"):
+            if u < v:
+                self.predecessors[v].append((u, weight))
+                self.successors[u].append((v, weight))
+        # Vertices reachable from 0 through forward edges, the others only have free vertices upstream
+        self.reachable = [False] * n_nodes
+        self.reachable[0] = True
+        for v in range(1, n_nodes):
+            self.reachable[v] = any(self.reachable[u] for u, _ in self.predecessors[v])
+
+    def _sweep(self, clock, delta_0):
+        """
+        Greedy retiming in topological order with r(0) = 0 and delta(0) = delta_0: with L = max(r(u) - w(u, v)) over the
+        in-edges, r(v) = L keeps a zero weight on the edges realizing L and is chosen if the resulting delta(v) fits in
+        clock, otherwise r(v) = L + 1 puts a register on every in-edge. By induction, every legal retiming with
+        r(0) = 0 and clock period <= clock has r(v) > r_greedy(v), or r(v) = r_greedy(v) with delta(v) >= delta_greedy(v)
+        :return: retiming list and delta list of the reachable vertices
+        """
+        retiming, delta = [0] * len(self.delays), [0] * len(self.delays)
+        delta[0] = delta_0
+        for v in range(1, len(self.delays)):
+            if not self.reachable[v]:
+                continue
+            level, arrival = None, 0
+            for u, weight in self.predecessors[v]:
+                if not self.reachable[u]:
+                    continue
+                if level is None or retiming[u] - weight > level:
+                    level, arrival = retiming[u] - weight, delta[u]
+                elif retiming[u] - weight == level:
+                    arrival = max(arrival, delta[u])
+            if self.delays[v] + arrival <= clock:
+                retiming[v], delta[v] = level, self.delays[v] + arrival
+            else:
+                retiming[v], delta[v] = level + 1, self.delays[v]
+        return retiming, delta
+
+    def feasible(self, clock):
+        """
+        Legal retiming with clock period <= clock, or None if there is none:
+        1) the greedy sweep minimizes r(t): if r(t) > w(f) the feedback edge gets a negative weight for every retiming
+        2) if r(t) < w(f) the feedback edge keeps a register and the sweep is a valid retiming
+        3) if r(t) = w(f), as it must be for every legal retiming, the feedback edge has 0 weight and delta(0) becomes
+           d(0) + delta(t): the sweep is repeated from the larger delta(0) until it is a fixed point or fails
+        Vertices not reachable from 0 are then retimed in reverse topological order to put a register on every
+        out-edge, so that they never lengthen a combinational path
+        :param clock: clock period
+        :return: retiming dictionary or None
+        """
+        t = len(self.delays) - 1
+        delta_0 = self.delays[0]
+        while delta_0 <= clock:
+            retiming, delta = self._sweep(clock, delta_0)
+            if not self.reachable[t] or retiming[t] < self.feedback_weight:
+                break
+            if retiming[t] > self.feedback_weight:
+                return None
+            if self.delays[0] + delta[t] == delta_0:
+                break
+            delta_0 = self.delays[0] + delta[t]
+        else:
+            return None
+        for v in reversed(range(len(self.delays))):
+            if not self.reachable[v]:
+                out_bounds = [retiming[x] + weight - 1 for x, weight in self.successors[v]]
+                if v == t:
+                    out_bounds.append(self.feedback_weight - 1)
+                retiming[v] = min(out_bounds, default=0)
+        return dict(enumerate(retiming))
+
+
+def correlator_retiming(graph, verbose=False):
+    """
+    Optimal retiming and clock period of a correlator shaped graph (see is_correlator_shaped) with integer delays,
+    without W and D: the optimal clock period is an integer between the largest delay and the clock period of the
+    graph, found by bisection with the O(V + E) feasibility check of _CorrelatorSolver
+    :param graph: directed retiming graph, it must be correlator shaped
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: optimal retiming dictionary and optimal clock
+    """
+    solver = _CorrelatorSolver(graph)
+    lower_bound, upper_bound = max(solver.delays), cp_algorithm(graph)
+    best_retiming = {v: 0 for v in graph.nodes}
+    while lower_bound < upper_bound:
+        clock = (lower_bound + upper_bound) // 2
+        retiming = solver.feasible(clock)
+        if retiming is None:
+            lower_bound = clock + 1
+        else:
+            best_retiming, upper_bound = retiming, clock
+        if verbose:
+            print(f"Optimal clock period in [{lower_bound}, {upper_bound}]")
+    return best_retiming, upper_bound
+
+
+def correlator_opt_algorithm(graph, draw=False, verbose=False):
+    """
+    Optimal retiming with the correlator fast path when the graph is correlator shaped with integer delays, and with
+    OPT1 otherwise
+    :param graph: directed retiming graph
+    :param draw: True if we want to draw the retimed graph
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: retimed graph and optimal clock
+    """
+    integral = all(float(delay).is_integer() for _, delay in graph.nodes(data="delay"))
+    if is_correlator_shaped(graph) and integral:
+        if verbose:
+            print("Computing optimal retiming with the correlator fast path")
+        retiming, optimal_clock = correlator_retiming(graph, verbose=verbose)
+    else:
+        if verbose:
+            print("Graph is not correlator shaped, computing optimal retiming with OPT1 algorithm")
+        retiming, optimal_clock = opt1_retiming(graph, verbose=verbose)
+    G_r = compute_retimed_graph(graph, retiming)
+    if draw:
+        draw_retiming_graph(G_r)
+    return G_r, optimal_clock
@@ -1,22 +1,32 @@
 import networkx as nx
 
+from retiming.RetimedGraphView import RetimedGraphView
+
 
 def cp_algorithm(graph):
     """
     Returns the maximum of the delta array, i.e. the optimal (minimum) clock period
-    :param graph:
+    :param graph: graph of the synchronous circuit, or a RetimedGraphView
     :return:
     """
+    if isinstance(graph, RetimedGraphView):
+        return graph.delta().max().item()
     return max(delta_array(graph).values())
 
 
 def delta_array(graph, verbose=False):
     """
     Compute the delta array period of a synchronous circuit graph
-    :param graph: graph of the synchronous circuit. Pass G.graph as parameter
+    :param graph: graph of the synchronous circuit. Pass G.graph as parameter, or a RetimedGraphView
     :param verbose: True  [False] to enable [disable] verbosity
     :return: Clock period or delta array of a given graph
     """
+    # A view computes the delta array on its arrays, without building G_0
+    if isinstance(graph, RetimedGraphView):
+        delta = dict(enumerate(graph.delta().tolist()))
+        if verbose:
+            print(delta)
+        return delta
 
     # 0) Preliminary step - instantiate needed variables
     edge_attributes = nx.get_edge_attributes(graph, "weight")
@@ -0,0 +1,81 @@
+import numpy as np
+
+from algorithms.path_engines import bellman_ford_potentials, edge_arrays, floyd_warshall_all_pairs
+
+
+def batch_wd(graph, delays, block_size=64):
+    """
+    W and D matrices of a graph for a batch of delay vectors. W depends only on the topology and the register weights,
+    so it is computed once; the d(u) edge lengths of every delay vector are stacked with the register weights and the
+    whole (1 + B, V, V) stack is closed by a single vectorized Floyd-Warshall
+    :param graph: directed retiming graph, its own delays are ignored
+    :param delays: array (B, V) of node delays, one row per delay vector
+    :param block_size: size of the Floyd-Warshall vertex blocks
+    :return: W matrix (V, V) and stack of D matrices (B, V, V), np.nan for unreachable pairs as in wd_algorithm
+    """
+    delays = np.atleast_2d(np.asarray(delays, dtype=float))
+    tails, heads, weights, _ = edge_arrays(graph)
+    lengths = np.concatenate((weights[None, :], delays[:, tails]))
+    closure = floyd_warshall_all_pairs(len(graph.nodes), tails, heads, lengths, block_size=block_size)
+    w_mat, d_mats = closure[0], closure[1:] + delays[:, None, :]
+    w_mat[np.isinf(w_mat)], d_mats[np.isinf(d_mats)] = np.nan, np.nan
+    return w_mat, d_mats
+
+
+def _batch_constraints(graph, w_mat, d_mats, clocks):
+    """
+    Constraint graphs of OPT1 for every (D, clock) of the batch on the same edges: the graph edges plus one edge per
+    pair (u, v), whose length is W(u, v) - 1 where D(u, v) > clock and infinite (inactive) elsewhere
+    :return: tails, heads and lengths (B, m + V^2) of the constraint edges
+    """
+    tails, heads, weights, _ = edge_arrays(graph)
+    pairs_u, pairs_v = np.nonzero(~np.isnan(w_mat))
+    active = d_mats[:, pairs_u, pairs_v] > clocks[:, None]
+    pair_lengths = np.where(active, (w_mat[pairs_u, pairs_v] - 1)[None, :], np.inf)
+    lengths = np.concatenate((np.broadcast_to(weights, (len(clocks), len(weights))), pair_lengths), axis=1)
+    # Constraint r(u) - r(v) <= b is the edge v -> u of length b in the constraint graph
+    return np.concatenate((heads, pairs_v)), np.concatenate((tails, pairs_u)), lengths
+
+
+def delay_batch_algorithm(graph, delays, block_size=64, verbose=False):
+    """
+    OPT1 on the same topology for a batch of delay vectors, e.g. Monte-Carlo delay corners:
+    1) W and every D are computed at once with batch_wd
+    2) the binary searches over the sorted distinct values of each D run in lockstep: at every step the feasibility
+       of the B middle clocks is checked by a single Bellman-Ford vectorized over the batch
+    Every delay vector gets the same optimal clock and retiming opt1_retiming would return for it
+    :param graph: directed retiming graph, its own delays are ignored
+    :param delays: array (B, V) of node delays, one row per delay vector
+    :param block_size: size of the Floyd-Warshall vertex blocks
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: array (B,) of optimal clocks and array (B, V) of retimings
+    """
+    n_nodes = len(graph.nodes)
+    w_mat, d_mats = batch_wd(graph, delays, block_size=block_size)
+    batch = np.arange(len(d_mats))
+
+    # Sorted distinct values of every D, padded with inf to the same length
+    candidates = [np.unique(d_mat[~np.isnan(d_mat)]) for d_mat in d_mats]
+    sorted_d = np.full((len(candidates), max(map(len, candidates))), np.inf)
+    for b, values in enumerate(candidates):
+        sorted_d[b, :len(values)] = values
+
+    # 2) Lockstep binary search, as in OPT1
+    left, right = np.zeros(len(batch), dtype=int), np.array([len(values) - 1 for values in candidates])
+    while (left <= right).any():
+        searching = left <= right
+        mid = (left + right) // 2
+        clocks = sorted_d[batch, np.minimum(mid, sorted_d.shape[1] - 1)]
+        tails, heads, lengths = _batch_constraints(graph, w_mat, d_mats[searching], clocks[searching])
+        feasible = np.zeros(len(batch), dtype=bool)
+        feasible[searching] = bellman_ford_potentials(n_nodes, tails, heads, lengths)[1]
+        left = np.where(searching & ~feasible, mid + 1, left)
+        right = np.where(searching & feasible, mid - 1, right)
+
+    # The largest D value is always feasible (no type 2 constraints), so left is a valid index
+    optimal_clocks = sorted_d[batch, left]
+    tails, heads, lengths = _batch_constraints(graph, w_mat, d_mats, optimal_clocks)
+    retimings = bellman_ford_potentials(n_nodes, tails, heads, lengths)[0].astype(int)
+    if verbose:
+        print(f"Optimal clock periods of {len(batch)} delay vectors: {optimal_clocks}")
+    return optimal_clocks, retimings
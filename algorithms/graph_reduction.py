@@ -0,0 +1,109 @@
+import networkx as nx
+
+from algorithms.opt1 import opt1_retiming
+from algorithms.opt2 import opt2_retiming
+from utils.retiming_utils import compute_retimed_graph, draw_retiming_graph
+
+RETIMING_ALGORITHMS = {"opt1": opt1_retiming, "opt2": opt2_retiming}
+
+
+def _is_pass_through(graph, v):
+    """
+    A vertex is a pass-through if it has zero delay and exactly one incoming and one outgoing edge, to two different
+    vertices: u -> v -> x can then be replaced by u -> x with weight w(u, v) + w(v, x) without changing any clock
+    :param graph: directed retiming graph
+    :param v: vertex
+    :return: True | False
+    """
+    if graph.nodes[v]["delay"] != 0 or graph.in_degree(v) != 1 or graph.out_degree(v) != 1:
+        return False
+    (u, _), (_, x) = next(iter(graph.in_edges(v))), next(iter(graph.out_edges(v)))
+    return len({u, v, x}) == 3
+
+
+def reduce_retiming_graph(graph, verbose=False):
+    """
+    Contract the structures that inflate V and E without changing the optimal clock:
+    1) zero-delay pass-through vertices, and so series chains of them, are replaced by a single edge carrying the sum
+       of their registers
+    2) parallel edges produced by a contraction (duplicate paths) are merged keeping the smallest register count, the
+       only one that matters both for legality and for combinational paths
+    Nothing else is reduced: parallel paths through vertices with a delay, or zero-delay vertices with several inputs
+    or outputs, are kept, so the reduced graph is not minimal. What is guaranteed is that it has the same optimal clock
+    as graph, and that expand_retiming turns any legal retiming of it into a legal retiming of graph with the same
+    clock period. The reduced graph is relabelled to 0, ..., k-1 as WD requires
+    :param graph: directed retiming graph
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: reduced graph and reduction dictionary, to be passed to expand_retiming
+    """
+    # Work on a copy holding only delays and weights
+    reduced = nx.DiGraph()
+    reduced.add_nodes_from((v, {"delay": delay}) for v, delay in graph.nodes(data="delay"))
+    reduced.add_weighted_edges_from(graph.edges(data="weight"))
+
+    contractions = []
+    candidates = [v for v in reduced.nodes if _is_pass_through(reduced, v)]
+    while candidates:
+        v = candidates.pop()
+        if v not in reduced or not _is_pass_through(reduced, v):
+            continue
+        (u, _, w_in), (_, x, w_out) = next(iter(reduced.in_edges(v, data="weight"))), \
+            next(iter(reduced.out_edges(v, data="weight")))
+        reduced.remove_node(v)
+        weight = w_in + w_out
+        if reduced.has_edge(u, x):
+            weight = min(weight, reduced.edges[u, x]["weight"])
+        reduced.add_edge(u, x, weight=weight)
+        contractions.append((v, u, x, w_in, w_out))
+        # Merging parallel edges lowers the degrees of u and x, which may become pass-through themselves
+        candidates.extend([u, x])
+
+    labels = sorted(reduced.nodes)
+    reduced = nx.relabel_nodes(reduced, {v: index for index, v in enumerate(labels)})
+    if verbose:
+        print(f"Reduced graph from {len(graph.nodes)} to {len(labels)} vertices, "
+              f"{graph.number_of_edges()} to {reduced.number_of_edges()} edges")
+    return reduced, {"labels": labels, "contractions": contractions}
+
+
+def expand_retiming(reduction, retiming):
+    """
+    Expand a retiming of the reduced graph onto the original vertices, undoing contractions in reverse order. A
+    contracted vertex v on u -> v -> x gets any retiming keeping both its edges legal,
+    r(u) - w(u, v) <= r(v) <= r(x) + w(v, x), which is a non-empty range since the contracted edge u -> x was legal;
+    0 is kept whenever possible so registers are moved as little as possible
+    :param reduction: reduction dictionary from reduce_retiming_graph
+    :param retiming: retiming dictionary of the reduced graph
+    :return: retiming dictionary of the original graph
+    """
+    expanded = {reduction["labels"][index]: r for index, r in retiming.items()}
+    for v, u, x, w_in, w_out in reversed(reduction["contractions"]):
+        expanded[v] = min(max(0, expanded[u] - w_in), expanded[x] + w_out)
+    return expanded
+
+
+def reduced_opt_algorithm(graph, algorithm="opt1", draw=False, verbose=False):
+    """
+    Optimal retiming with a reduction stage before WD, used by runner.py --reduce: the reduced graph is solved with
+    OPT1 or OPT2 and its retiming is expanded back, so the retimed graph has the same vertices, edges and optimal clock
+    as without reduction. The retiming itself may differ from the one of OPT1 / OPT2 on the whole graph, and this is
+    intended: those return one arbitrary optimal retiming among many (the Bellman-Ford potentials of the constraints),
+    a contracted vertex can take any value of a range without changing the clock, and expand_retiming picks the one
+    moving the fewest registers instead of reproducing a value that has no meaning of its own
+    :param graph: directed retiming graph
+    :param algorithm: 'opt1' | 'opt2'
+    :param draw: True if we want to draw the retimed graph
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: retimed graph and optimal clock
+    """
+    if algorithm not in RETIMING_ALGORITHMS:
+        raise ValueError("algorithm can be either 'opt1' or 'opt2'")
+    # 1) Reduce the graph
+    reduced, reduction = reduce_retiming_graph(graph, verbose=verbose)
+    # 2) Solve the reduced graph
+    retiming, optimal_clock = RETIMING_ALGORITHMS[algorithm](reduced, verbose=verbose)
+    # 3) Expand the retiming and apply it to the original graph
+    G_r = compute_retimed_graph(graph, expand_retiming(reduction, retiming))
+    if draw:
+        draw_retiming_graph(G_r)
+    return G_r, optimal_clock
@@ -0,0 +1,364 @@
+import heapq
+from collections import deque
+
+import numpy as np
+
+from algorithms.opt1 import opt1_retiming
+from algorithms.path_engines import _adjacency_lists, bellman_ford_potentials, edge_arrays, node_delays, \
+    zero_weight_paths
+from algorithms.wd_algorithm import paper_wd_algorithm
+from retiming.RetimedGraphView import RetimedGraphView
+from utils.retiming_utils import compute_retimed_graph, draw_retiming_graph
+
+
+# Nodes expanded by each search of clock_constraints, the constraints it misses are added by min_area_retiming
+CONSTRAINT_SEARCH_SIZE = 256
+
+
+def _tightest_constraints(n_nodes, tails, heads, bounds):
+    """
+    :return: the constraint arrays with only the tightest bound for each pair (u, v)
+    """
+    keys = tails * n_nodes + heads
+    order = np.lexsort((bounds, keys))
+    keys, first = np.unique(keys[order], return_index=True)
+    return keys // n_nodes, keys % n_nodes, bounds[order][first]
+
+
+def clock_constraints(graph, clock, search_size=CONSTRAINT_SEARCH_SIZE):
+    """
+    Difference constraints r(u) - r(v) <= b of the legal retimings with clock period <= clock, generated from the edge
+    arrays without the W and D matrices. From every source u a lexicographic search visits the nodes by increasing
+    W(u, x), and among equal W in topological order of the zero-weight subgraph, keeping the largest delay of a minimum
+    weight path. A node x with D(u, x) > clock gives the constraint r(u) - r(x) <= W(u, x) - 1 and is not expanded:
+    the constraints of the nodes behind it are implied by its own ones and the edge constraints (Shenoy and Rudell).
+    Bounds found through a non minimum weight path are larger than W(u, x) - 1, hence implied as well.
+    A search stops after search_size expanded nodes, so that the generation takes O(V * search_size) steps: the set is
+    complete when the clock is a few gate delays, as on the systolic and ring workloads, but not on graphs with long
+    register free paths, where a search would visit O(V) nodes (min_area_retiming adds the missing constraints)
+    :param graph: directed retiming graph, nodes labelled 0, ..., n-1, with integer weights
+    :param clock: target clock period
+    :param search_size: maximum number of nodes expanded from a source, None for the complete set
+    :return: arrays of tails u, heads v and integer bounds b of the constraints, edge constraints r(u) - r(v) <= w(u, v)
+             included, the tightest one for each pair; None if a node delay exceeds clock
+    """
+    tails, heads, weights, _ = edge_arrays(graph)
+    if not np.array_equal(weights, np.rint(weights)):
+        raise ValueError("Minimum area retiming needs integer edge weights")
+    weights = weights.astype(np.int64)
+    delays = node_delays(graph)
+    n_nodes = len(delays)
+    if (delays > clock).any():
+        return None
+    if search_size is None:
+        search_size = n_nodes
+    levels = zero_weight_paths(n_nodes, tails, heads, weights, np.ones(n_nodes, dtype=int)).tolist()
+    successors = _adjacency_lists(n_nodes, tails, heads, weights)
+    delays = delays.tolist()
+    constraint_tails, constraint_heads, bounds = tails.tolist(), heads.tolist(), weights.tolist()
+    for u in range(n_nodes):
+        best = {u: (0, delays[u])}
+        heap = [(0, levels[u], u)]
+        visited = set()
+        while heap and len(visited) < search_size:
+            weight, _, x = heapq.heappop(heap)
+            if x in visited:
+                continue
+            visited.add(x)
+            delay = best[x][1]
+            if x != u and delay > clock:
+                constraint_tails.append(u)
+                constraint_heads.append(x)
+                bounds.append(weight - 1)
+                continue
+            for y, edge_weight in successors[x]:
+                if y in visited:
+                    continue
+                path_weight, path_delay = weight + edge_weight, delay + delays[y]
+                previous = best.get(y)
+                if previous is None or (-path_weight, path_delay) > (-previous[0], previous[1]):
+                    best[y] = path_weight, path_delay
+                    heapq.heappush(heap, (path_weight, levels[y], y))
+    return _tightest_constraints(n_nodes, np.array(constraint_tails), np.array(constraint_heads),
+                                 np.array(bounds, dtype=np.int64))
+
+
+def critical_path_cuts(graph, retiming, clock):
+    """
+    Constraints violated by a retiming whose clock period exceeds clock. For every node v with delta_r(v) > clock, the
+    critical register free path of the retimed graph ending in v is cut at the latest node u such that the path u ~> v
+    is longer than clock, found for all the nodes at once by binary lifting on the critical predecessors. That path
+    keeps w(p) = r(u) - r(v) registers of the original graph, so every legal retiming satisfies
+    r(u) - r(v) <= w(p) - 1, which this retiming violates
+    :param graph: directed retiming graph, nodes labelled 0, ..., n-1
+    :param retiming: array of retiming values, indexed by node
+    :param clock: target clock period, at least the largest node delay
+    :return: arrays of tails u, heads v and integer bounds b of the cuts, None if the retiming reaches clock
+    """
+    tails, heads, weights, _ = edge_arrays(graph)
+    delays = node_delays(graph)
+    n_nodes = len(delays)
+    retimed_weights = weights + retiming[heads] - retiming[tails]
+    delta = zero_weight_paths(n_nodes, tails, heads, retimed_weights, delays)
+    late = np.flatnonzero(delta > clock)
+    if late.size == 0:
+        return None
+    # Critical predecessor: the tail of a zero weight edge with the largest delta, the node itself for a path start
+    zero = retimed_weights == 0
+    zero_tails, zero_heads = tails[zero], heads[zero]
+    order = np.lexsort((delta[zero_tails], zero_heads))
+    zero_tails, zero_heads = zero_tails[order], zero_heads[order]
+    last = np.append(zero_heads[1:] != zero_heads[:-1], True)
+    predecessor = np.arange(n_nodes)
+    predecessor[zero_heads[last]] = zero_tails[last]
+    # Delay of the critical path before every node, and the largest one a path start u ~> v can leave out
+    before = delta - delays
+    target = delta[late] - clock
+    # Farthest ancestor x with before(x) >= target, the path from its predecessor u is the shortest one over clock
+    ancestor, jumps = late.copy(), [predecessor]
+    while len(jumps) < max(1, n_nodes.bit_length()):
+        jumps.append(jumps[-1][jumps[-1]])
+    for jump in reversed(jumps):
+        candidate = jump[ancestor]
+        ancestor = np.where(before[candidate] >= target, candidate, ancestor)
+    starts = predecessor[ancestor]
+    return starts, late, (retiming[starts] - retiming[late] - 1).astype(np.int64)
+
+
+def _residual_arcs(n_nodes, tails, heads):
+    """
+    Static successor lists [(v, arc, direction), ...] of the residual graph, built once for all the phases: every arc
+    u -> v has infinite capacity and gives u -> v (direction 1), and v -> u (direction -1) usable while it carries flow.
+    The length of a residual arc is direction * reduced[arc], read from the current reduced costs
+    """
+    successors = [[] for _ in range(n_nodes)]
+    for arc, (u, v) in enumerate(zip(tails, heads)):
+        successors[u].append((v, arc, 1))
+        successors[v].append((u, arc, -1))
+    return successors
+
+
+def _distances_to_deficit(n_nodes, successors, reduced, flow, excess):
+    """
+    Dial's algorithm from every node with positive excess at once, stopped at the first node with negative excess
+    :return: distances (None for the nodes not reached) and the distance of that node, None if none is reachable
+    """
+    dist = [None] * n_nodes
+    buckets = {0: [v for v in range(n_nodes) if excess[v] > 0]}
+    levels = [0]
+    while levels:
+        level = heapq.heappop(levels)
+        bucket = buckets.pop(level)
+        while bucket:
+            u = bucket.pop()
+            if dist[u] is not None:
+                continue
+            dist[u] = level
+            if excess[u] < 0:
+                return dist, level
+            for v, arc, direction in successors[u]:
+                if dist[v] is not None or (direction == -1 and flow[arc] == 0):
+                    continue
+                length = direction * reduced[arc]
+                if length == 0:
+                    bucket.append(v)
+                elif level + length in buckets:
+                    buckets[level + length].append(v)
+                else:
+                    buckets[level + length] = [v]
+                    heapq.heappush(levels, level + length)
+    return dist, None
+
+
+def _augment(n_nodes, successors, reduced, excess, flow):
+    """
+    Dinic's blocking flows on the admissible graph, the residual arcs of zero reduced cost, from the nodes with
+    positive excess to the ones with negative excess, until no augmenting path is left. excess and flow are updated in
+    place
+    """
+    while True:
+        sources = [v for v in range(n_nodes) if excess[v] > 0]
+        level = [-1] * n_nodes
+        for v in sources:
+            level[v] = 0
+        # Breadth first search up to the first level holding a node with negative excess
+        frontier, depth, reached = sources, 0, False
+        while frontier and not reached:
+            depth += 1
+            next_frontier = []
+            for u in frontier:
+                for v, arc, direction in successors[u]:
+                    if level[v] < 0 and reduced[arc] == 0 and (direction == 1 or flow[arc] > 0):
+                        level[v] = depth
+                        next_frontier.append(v)
+                        reached = reached or excess[v] < 0
+            frontier = next_frontier
+        if not reached:
+            return
+        pointer = [0] * n_nodes
+        for source in sources:
+            path, u = [], source
+            while excess[source] > 0:
+                if u != source and excess[u] < 0:
+                    amount = min([excess[source], -excess[u]] + [flow[arc] for _, arc, direction in path
+                                                                 if direction == -1])
+                    for _, arc, direction in path:
+                        flow[arc] += direction * amount
+                    excess[source] -= amount
+                    excess[u] += amount
+                    # Resume from the first backward arc left without flow, the rest of the path is still usable
+                    for index, (tail, arc, direction) in enumerate(path):
+                        if direction == -1 and flow[arc] == 0:
+                            path, u = path[:index], tail
+                            break
+                    continue
+                arcs = successors[u]
+                while pointer[u] < len(arcs):
+                    v, arc, direction = arcs[pointer[u]]
+                    if level[v] == level[u] + 1 and reduced[arc] == 0 and (direction == 1 or flow[arc] > 0):
+                        break
+                    pointer[u] += 1
+                if pointer[u] < len(arcs) and level[u] < depth:
+                    v, arc, direction = arcs[pointer[u]]
+                    path.append((u, arc, direction))
+                    u = v
+                else:
+                    # Dead end, never visited again in this phase
+                    level[u] = -1
+                    if not path:
+                        break
+                    u, _, _ = path.pop()
+                    pointer[u] += 1
+
+
+def min_cost_flow(n_nodes, tails, heads, costs, supply):
+    """
+    Uncapacitated minimum cost flow with the primal-dual algorithm on edge arrays. Node potentials p keep every reduced
+    cost c(u, v) + p(u) - p(v) of the residual graph non-negative, starting from the Bellman-Ford potentials of
+    path_engines. Each phase raises the potentials by the Dial distances from the nodes with positive excess, capped at
+    the distance of the closest node with negative excess, and then pushes a maximum flow on the arcs of zero reduced
+    cost. The residual graph is built once, a phase only recomputes the reduced costs. At the end the potentials are
+    tight on every arc carrying flow, so they are optimal dual variables
+    :param n_nodes: number of nodes
+    :param tails: array of arc tails
+    :param heads: array of arc heads
+    :param costs: array of integer arc costs
+    :param supply: array of integer node supplies, summing to 0
+    :return: flow array and potentials array, None if the costs have a negative cycle (the flow is unbounded)
+    """
+    potentials, feasible = bellman_ford_potentials(n_nodes, tails, heads, costs)
+    if not feasible:
+        return None
+    potentials = np.rint(potentials).astype(np.int64)
+    flow = [0] * len(tails)
+    excess = [int(value) for value in supply]
+    successors = _residual_arcs(n_nodes, tails.tolist(), heads.tolist())
+    while any(value > 0 for value in excess):
+        reduced = (costs + potentials[tails] - potentials[heads]).tolist()
+        dist, cap = _distances_to_deficit(n_nodes, successors, reduced, flow, excess)
+        if cap is None:
+            raise ValueError("The supplies cannot be routed to the demands")
+        potentials += np.array([cap if distance is None else min(distance, cap) for distance in dist])
+        reduced = (costs + potentials[tails] - potentials[heads]).tolist()
+        _augment(n_nodes, successors, reduced, excess, flow)
+    return np.array(flow), potentials
+
+
+def degree_balance(graph):
+    """
+    :param graph: directed retiming graph, nodes labelled 0, ..., n-1
+    :return: array of indegree(v) - outdegree(v), the coefficients of r(v) in the register count of a retiming
+    """
+    tails, heads, _, _ = edge_arrays(graph)
+    n_nodes = len(graph.nodes)
+    return np.bincount(heads, minlength=n_nodes) - np.bincount(tails, minlength=n_nodes)
+
+
+def min_area_retiming(graph, clock, constraints=None, verbose=False):
+    """
+    Minimum register retiming with clock period <= clock, the linear program
+        min sum(w_r(e)) = sum(w(e)) + sum(r(v) * (indegree(v) - outdegree(v)))
+        s.t. the constraints of clock_constraints
+    solved through its dual, a minimum cost flow: every constraint r(u) - r(v) <= b is an arc u -> v of cost b and
+    infinite capacity, and every vertex v supplies outdegree(v) - indegree(v) units of flow. The optimal retiming is
+    r = -p for the potentials p of min_cost_flow, which satisfy every constraint and are tight on the arcs carrying
+    flow (complementary slackness). When the constraint set is incomplete (bounded searches of clock_constraints) and
+    the retiming misses clock, the critical_path_cuts are added and the program solved again: each cut is valid for
+    every legal retiming, so the first retiming reaching clock is optimal. A run takes one flow per round, a single one
+    when the set is complete.
+    Measured on the workload corpus at the clock of multilevel_retiming, constraint generation included: ring 10^5
+    nodes in 2s, systolic 10^4 in 7s but 10^5 in 6 minutes, spent in the primal-dual phases, netlist 10^4 in 14s
+    (9 rounds, 200s with complete searches) and 3 * 10^4 in 85s (11 rounds). 10^5 nodes in seconds is only reached on
+    the ring family
+    :param graph: directed retiming graph, nodes labelled 0, ..., n-1, with integer weights
+    :param clock: target clock period
+    :param constraints: output of clock_constraints(graph, clock), if already computed
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: retiming dictionary and its number of registers, None if no retiming reaches clock
+    """
+    if constraints is None:
+        constraints = clock_constraints(graph, clock)
+    n_nodes, supply = len(graph.nodes), -degree_balance(graph)
+    rounds, retiming = 0, None
+    while constraints is not None:
+        rounds += 1
+        result = min_cost_flow(n_nodes, *constraints, supply)
+        if result is None:
+            break
+        retiming = -result[1]
+        cuts = critical_path_cuts(graph, retiming, clock)
+        if cuts is None:
+            break
+        retiming = None
+        constraints = _tightest_constraints(n_nodes, *(np.concatenate(pair) for pair in zip(constraints, cuts)))
+    if retiming is None:
+        if verbose:
+            print(f"No feasible retiming exists for clock period {clock}")
+        return None
+    if verbose:
+        print(f"{len(constraints[0])} constraints and {rounds} minimum cost flows for clock period {clock}")
+    registers = RetimedGraphView(graph, retiming).registers
+    if verbose:
+        print(f"Minimum area retiming with clock period {clock}: {registers} registers")
+    return dict(enumerate(retiming.tolist())), registers
+
+
+def min_area_algorithm(graph, clock=None, draw=False, verbose=False):
+    """
+    Minimum register retiming for a target clock. The register count is reported together with the one of the graph
+    and the one of the Bellman-Ford solution of the same constraints, the retiming OPT1 would return. Without a target
+    clock the optimal one is computed with OPT1 on the W and D matrices, which takes O(V^2) memory: pass clock for
+    large graphs
+    :param graph: directed retiming graph, nodes labelled 0, ..., n-1, with integer weights
+    :param clock: target clock period, None for the optimal clock
+    :param draw: True if we want to draw the retimed graph
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: retimed graph, clock, registers of the Bellman-Ford retiming and of the minimum area one; None if no
+             retiming reaches clock
+    """
+    if clock is None:
+        # Paper D matrix, whose constraints are exact for every clock
+        w_mat, d_mat = paper_wd_algorithm(graph, verbose=verbose)
+        _, clock = opt1_retiming(graph, w_mat=w_mat, d_mat=d_mat)
+    constraints = clock_constraints(graph, clock)
+    result = min_area_retiming(graph, clock, constraints=constraints, verbose=verbose)
+    if result is None:
+        return None
+    retiming, registers = result
+    # Bellman-Ford retiming, with the cuts of the constraints the bounded searches missed
+    n_nodes = len(graph.nodes)
+    while True:
+        dist, _ = bellman_ford_potentials(n_nodes, constraints[1], constraints[0], constraints[2])
+        dist = np.rint(dist).astype(np.int64)
+        cuts = critical_path_cuts(graph, dist, clock)
+        if cuts is None:
+            break
+        constraints = _tightest_constraints(n_nodes, *(np.concatenate(pair) for pair in zip(constraints, cuts)))
+    bellman_ford_registers = RetimedGraphView(graph, dist).registers
+    G_r = compute_retimed_graph(graph, retiming)
+    if verbose:
+        print(f"Registers: {graph.size(weight='weight')} in the graph, {bellman_ford_registers} with Bellman-Ford, "
+              f"{registers} with the minimum area retiming")
+    if draw:
+        draw_retiming_graph(G_r)
+    return G_r, clock, bellman_ford_registers, registers
@@ -0,0 +1,171 @@
+import networkx as nx
+import numpy as np
+
+from algorithms.opt1 import opt1_retiming
+from algorithms.path_engines import edge_arrays, node_delays, zero_weight_paths
+from utils.retiming_utils import compute_retimed_graph, draw_retiming_graph
+
+
+def _coarsen(n_nodes, tails, heads, weights, delays):
+    """
+    One coarsening level: match vertices along zero-weight edges u -> v, the combinational paths that most constrain
+    the clock, and merge every matched pair into one vertex that gets the sum of the delays (a merged vertex is
+    retimed as a whole, and any combinational path through it is counted d(u) + d(v), which is conservative).
+    Parallel edges keep the smallest weight, again conservatively, and edges inside a merged vertex are dropped.
+    Only tight edges, level(v) = level(u) + 1 in the zero-weight DAG, are matched, and only if u is the only tight
+    predecessor of v or v the only tight successor of u: a zero-weight cycle of the coarse graph could only go through
+    merged vertices from the tail of one pair to the head of another at the same levels, and would need pairs breaking
+    both conditions, so the coarse graph still satisfies W2
+    :return: labels of the vertices in the coarse graph and coarse tails, heads, weights and delays
+    """
+    levels = zero_weight_paths(n_nodes, tails, heads, weights, np.ones(n_nodes, dtype=int))
+    tight = (weights == 0) & (levels[heads] == levels[tails] + 1)
+    tight_in = np.bincount(heads[tight], minlength=n_nodes)
+    tight_out = np.bincount(tails[tight], minlength=n_nodes)
+    candidates = np.flatnonzero(tight & ((tight_in[heads] == 1) | (tight_out[tails] == 1)))
+    partner = np.arange(n_nodes)
+    for u, v in zip(tails[candidates].tolist(), heads[candidates].tolist()):
+        if partner[u] == u and partner[v] == v:
+            partner[u], partner[v] = v, u
+    labels = np.unique(np.minimum(np.arange(n_nodes), partner), return_inverse=True)[1]
+    n_coarse = labels.max() + 1
+    coarse_delays = np.bincount(labels, weights=delays, minlength=n_coarse)
+
+    coarse_tails, coarse_heads = labels[tails], labels[heads]
+    external = coarse_tails != coarse_heads
+    keys = coarse_tails[external] * n_coarse + coarse_heads[external]
+    order = np.lexsort((weights[external], keys))
+    keys, first = np.unique(keys[order], return_index=True)
+    return labels, keys // n_coarse, keys % n_coarse, weights[external][order][first], coarse_delays
+
+
+def _level_graph(tails, heads, weights, delays):
+    """
+    Retiming graph of a level
+    """
+    graph = nx.DiGraph()
+    graph.add_nodes_from((v, {"delay": delay}) for v, delay in enumerate(delays.tolist()))
+    graph.add_weighted_edges_from(zip(tails.tolist(), heads.tolist(), weights.tolist()))
+    return graph
+
+
+def _clock_period(level, retiming):
+    """
+    Clock period of a level retimed by a retiming array, None if the retiming is not legal
+    """
+    tails, heads, weights, delays = level
+    retimed_weights = weights + retiming[heads] - retiming[tails]
+    if (retimed_weights < 0).any():
+        return None
+    return zero_weight_paths(len(delays), tails, heads, retimed_weights, delays).max()
+
+
+def _feas_sweeps(level, retiming, clock, max_sweeps):
+    """
+    FEAS from a warm start: up to max_sweeps times, increase by one the retiming of every vertex whose delta exceeds
+    clock. Each sweep is a single pass over the arrays of the level
+    :return: legal retiming array with clock period <= clock, or None if the sweeps did not find one
+    """
+    tails, heads, weights, delays = level
+    retiming = retiming.copy()
+    for _ in range(max_sweeps + 1):
+        retimed_weights = weights + retiming[heads] - retiming[tails]
+        if (retimed_weights < 0).any():
+            return None
+        late = zero_weight_paths(len(delays), tails, heads, retimed_weights, delays) > clock
+        if not late.any():
+            return retiming
+        retiming += late
+    return None
+
+
+def _refine(level, retiming, lower_bound, max_sweeps, tolerance, integral):
+    """
+    Improve a legal retiming by bisecting the target clock between the lower bound and its clock period, each target
+    tried with a limited number of warm started FEAS sweeps
+    :return: refined retiming array and its clock period
+    """
+    upper_bound = _clock_period(level, retiming)
+    while upper_bound - lower_bound > (0 if integral else tolerance):
+        clock = (lower_bound + upper_bound) // 2 if integral else (lower_bound + upper_bound) / 2
+        refined = _feas_sweeps(level, retiming, clock, max_sweeps)
+        if refined is None:
+            # Not a proof of infeasibility, the sweeps just give up on clocks up to this one
+            lower_bound = clock + 1 if integral else clock
+        else:
+            retiming, upper_bound = refined, _clock_period(level, refined)
+    return retiming, upper_bound
+
+
+def multilevel_retiming(graph, coarse_nodes=200, max_sweeps=50, tolerance=1e-6, verbose=False):
+    """
+    Multilevel retiming for graphs too large for exact methods:
+    1) coarsen: merge vertices along zero-weight edges level after level (see _coarsen) until the graph has at most
+       coarse_nodes vertices or stops shrinking
+    2) solve: run OPT1 on the coarse graph, or start from the zero retiming if it is still larger than coarse_nodes;
+       every coarse retiming is legal for the finer levels, since merged vertices share their retiming and coarse
+       edges keep the smallest weight of the edges they replace
+    3) project and refine: copy the retiming of each merged vertex to the vertices it contains, level by level, and
+       improve it on every level with warm started FEAS sweeps
+    The result is not optimal in general: it is reported with the largest delay, a cheap lower bound of the optimum
+    :param graph: directed retiming graph, nodes labelled 0, ..., n-1
+    :param coarse_nodes: size of the graph solved exactly
+    :param max_sweeps: maximum number of FEAS sweeps per refinement attempt
+    :param tolerance: refinement gap under which the search stops for non integer delays
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: retiming dictionary, its clock period and a lower bound of the optimal clock period
+    """
+    tails, heads, weights, _ = edge_arrays(graph)
+    delays = node_delays(graph)
+    integral = bool((delays == np.round(delays)).all())
+    lower_bound = delays.max()
+
+    # 1) Coarsening levels, finest first
+    levels = [(tails, heads, weights, delays)]
+    labels_list = []
+    while len(levels[-1][3]) > coarse_nodes:
+        labels, *coarse = _coarsen(len(levels[-1][3]), *levels[-1])
+        if len(coarse[3]) > 0.95 * len(levels[-1][3]):
+            break
+        labels_list.append(labels)
+        levels.append(tuple(coarse))
+        if verbose:
+            print(f"Coarsening level {len(levels) - 1}: {len(coarse[3])} vertices, {len(coarse[0])} edges")
+
+    # 2) Exact solution of the coarsest graph, if coarsening made it small enough for OPT1
+    if len(levels[-1][3]) <= coarse_nodes:
+        coarse_retiming, _ = opt1_retiming(_level_graph(*levels[-1]))
+        retiming = np.array([coarse_retiming[v] for v in range(len(levels[-1][3]))], dtype=int)
+    else:
+        retiming = np.zeros(len(levels[-1][3]), dtype=int)
+    retiming, clock = _refine(levels[-1], retiming, lower_bound, max_sweeps, tolerance, integral)
+
+    # 3) Projection and refinement, level by level
+    for level in reversed(range(len(labels_list))):
+        retiming, clock = _refine(levels[level], retiming[labels_list[level]], lower_bound, max_sweeps, tolerance,
+                                  integral)
+        if verbose:
+            print(f"Level {level}: clock period {clock}, lower bound {lower_bound}")
+    return dict(enumerate(retiming.tolist())), clock, lower_bound
+
+
+def multilevel_algorithm(graph, coarse_nodes=200, max_sweeps=50, draw=False, verbose=False):
+    """
+    Retimed graph computed with multilevel_retiming
+    :param graph: directed retiming graph
+    :param coarse_nodes: size of the graph solved exactly
+    :param max_sweeps: maximum number of FEAS sweeps per refinement attempt
+    :param draw: True if we want to draw the retimed graph
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: retimed graph, its clock period and a lower bound of the optimal clock period
+    """
+    if verbose:
+        print("Computing retiming with the multilevel algorithm")
+    retiming, clock, lower_bound = multilevel_retiming(graph, coarse_nodes=coarse_nodes, max_sweeps=max_sweeps,
+                                                       verbose=verbose)
+    G_r = compute_retimed_graph(graph, retiming)
+    if draw:
+        draw_retiming_graph(G_r)
+    if verbose:
+        print(f"Clock period {clock}, lower bound {lower_bound}")
+    return G_r, clock, lower_bound
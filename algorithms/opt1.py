@@ -1,12 +1,14 @@
+import networkx as nx
 import numpy as np
 
+from algorithms.certificates import retiming_certificate
 from algorithms.wd_algorithm import wd_algorithm
 from utils.retiming_utils import *
 
 
-def check_legal_retiming(graph, desired_clock, w_mat, d_mat, verbose=False):
+def retiming_constraints(graph, desired_clock, w_mat, d_mat):
     """
-    Check if a retiming is legal by solving constraints through Bellman Ford algorithm after building a constraint graph
+    Difference constraints of a legal retiming with clock period <= desired_clock, as edges of the constraint graph
     Constraint graph construction from Professor Jie-Hong R. Jiang's slides, National Taiwan University
     http://recipe.ee.ntu.edu.tw/LabWebsite/miniworkshop_Opt+App/Session%204-1%20JHJiang%20%5B%E7%9B%B8%E5%AE%B9%E6%A8%A1%E5%BC%8F%5D.pdf
 
@@ -18,19 +20,33 @@ def check_legal_retiming(graph, desired_clock, w_mat, d_mat, verbose=False):
     :param desired_clock: desired clock we want to achieve
     :param w_mat: W matrix from WD algorithm
     :param d_mat: D matrix from WD algorithm
-    :return: retiming if valid, else None
+    :return: list of constraint edges (v, u, bound), one for each constraint retiming(u) - retiming(v) <= bound
     """
-    # 1) Build constraint graph
-    G_constraint = nx.DiGraph()
     w = nx.get_edge_attributes(graph, "weight")
     edge_list_r = []
-    # 1.1) Constraint retiming(u) - retiming(v) <= w(e) will result in an edge  v -> u with weight w(e)
+    # 1) Constraint retiming(u) - retiming(v) <= w(e) will result in an edge  v -> u with weight w(e)
     for u, v in graph.edges:
         edge_list_r.append((v, u, w[u, v]))
-    # 1.2) Constraint retiming(u) - retiming(v) <= W(u, v) - 1 will result in an edge  v -> u with weight W(u, v) - 1
+    # 2) Constraint retiming(u) - retiming(v) <= W(u, v) - 1 will result in an edge  v -> u with weight W(u, v) - 1
     for u, v in list(np.argwhere(d_mat > desired_clock)):
         edge_list_r.append((v, u, w_mat[u, v] - 1))
-    # 1.3) Add a fictitious vertex v+1 and edge v+1 -> u for every vertex u in graph with weight 0
+    return edge_list_r
+
+
+def check_legal_retiming(graph, desired_clock, w_mat, d_mat, verbose=False):
+    """
+    Check if a retiming is legal by solving constraints through Bellman Ford algorithm after building a constraint graph
+    with the constraints of retiming_constraints
+    :param graph: directed retiming graph
+    :param desired_clock: desired clock we want to achieve
+    :param w_mat: W matrix from WD algorithm
+    :param d_mat: D matrix from WD algorithm
+    :return: retiming if valid, else None
+    """
+    # 1) Build constraint graph
+    G_constraint = nx.DiGraph()
+    edge_list_r = retiming_constraints(graph, desired_clock, w_mat, d_mat)
+    # Add a fictitious vertex v+1 and edge v+1 -> u for every vertex u in graph with weight 0
     for u in graph.nodes:
         edge_list_r.append(("V+1", u, 0))
     # Append those edges to constraint graph
@@ -79,31 +95,47 @@ def _opt1_binary_search(graph, vectorized_d, w_mat, d_mat, verbose=False):
     return retiming[left], vectorized_d[left]
 
 
-def opt1_algorithm(graph, draw=False, verbose=False):
+def opt1_retiming(graph, w_mat=None, d_mat=None, verbose=False):
     """
-    Implementation of the OPT1 algorithm from Leierson - Saxe paper. It uses as key elements the WD algorithm from Leierson - Saxe,
-    a binary search algorithm and the Bellman-Ford algorithm on the constraint graph to solve the inequality constraints
-    and obtain the optimal retiming, that is the solution of these constraint for the smallest possible value of the D matrix
+    Optimal retiming and clock period with OPT1, without building the retimed graph
     :param graph: retiming Networkx DiGrah
-    :param draw: True | False
+    :param w_mat: W matrix, if already computed with WD algorithm
+    :param d_mat: D matrix, if already computed with WD algorithm
     :param verbose: True  [False] to enable [disable] verbosity
-    :return:
+    :return: optimal retiming dictionary and optimal clock
     """
-    if verbose:
-        print("Computing optimal retiming with OPT1 algorithm")
     # 1) Compute W and D using algorithm WD
-    w_mat, d_mat = wd_algorithm(graph, verbose=verbose)
+    if w_mat is None or d_mat is None:
+        w_mat, d_mat = wd_algorithm(graph, verbose=verbose)
 
     # 2) Sort the elements in the range of D
     vectorized_d = np.unique(np.sort(d_mat.flatten()))
     # Remove eventual nans from vectorized_d array
     vectorized_d = vectorized_d[~np.isnan(vectorized_d)]
     # 3) Binary search among the elements of D for the minimum available clock period, chek correctness with Bellman Ford
-    retiming, optimal_clock = _opt1_binary_search(graph, vectorized_d, w_mat, d_mat, verbose=verbose)
+    return _opt1_binary_search(graph, vectorized_d, w_mat, d_mat, verbose=verbose)
+
+
+def opt1_algorithm(graph, draw=False, verbose=False, certificate=False):
+    """
+    Implementation of the OPT1 algorithm from Leierson - Saxe paper. It uses as key elements the WD algorithm from Leierson - Saxe,
+    a binary search algorithm and the Bellman-Ford algorithm on the constraint graph to solve the inequality constraints
+    and obtain the optimal retiming, that is the solution of these constraint for the smallest possible value of the D matrix
+    :param graph: retiming Networkx DiGrah
+    :param draw: True | False
+    :param verbose: True  [False] to enable [disable] verbosity
+    :param certificate: True to also return a certificate of the result, see algorithms.certificates
+    :return: retimed graph and optimal clock, and the certificate if requested
+    """
+    if verbose:
+        print("Computing optimal retiming with OPT1 algorithm")
+    retiming, optimal_clock = opt1_retiming(graph, verbose=verbose)
 
     G_r = compute_retimed_graph(graph, retiming)
 
     if draw:
         draw_retiming_graph(G_r)
 
+    if certificate:
+        return G_r, optimal_clock, retiming_certificate(graph, retiming, optimal_clock)
     return G_r, optimal_clock
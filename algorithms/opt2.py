@@ -1,38 +1,48 @@
+from time import time
+
+import networkx as nx
 import numpy as np
-from algorithms.wd_algorithm import wd_algorithm
+from algorithms.path_engines import dial_rows, edge_arrays, node_delays
+from algorithms.wd_algorithm import _small_integers, wd_algorithm
 from utils.retiming_utils import compute_retimed_graph, draw_retiming_graph
 from algorithms.cp_algorithm import cp_algorithm, delta_array
+from algorithms.certificates import retiming_certificate
+from retiming.RetimedGraphView import RetimedGraphView
 
 
-def feas_algorithm(graph, desired_clock, verbose=False):
+def feas_algorithm(graph, desired_clock, verbose=False, deadline=None):
     """
     FEAS algorithm produces a retiming of a directed graph, and checks whether the clock period is less than desired_clock
     :param graph: directed retiming graph
     :param desired_clock: desired clock period, int
     :param verbose: True  [False] to enable [disable] verbosity
+    :param deadline: time.time() value after which the computation is interrupted with a TimeoutError, None for no limit
     :return: retiming graph
     """
     # 1) For each vertex of graph set retiming(v) = 0
     retiming = {v: 0 for v in graph.nodes}
+    # Edge arrays are extracted once, every round only views them with the current retiming
+    view = RetimedGraphView(graph)
     # 2) Repeat |V| - 1 times
-    for i in range(len(graph.nodes) - 1):
-        # 2.1) Compute graph G_r with the existing retiming
-        G_r = compute_retimed_graph(graph, retiming)
+    for i in range(max(len(graph.nodes) - 1, 1)):
+        if deadline is not None and time() > deadline:
+            raise TimeoutError(f"FEAS interrupted for clock period {desired_clock}")
+        # 2.1) View graph G_r with the existing retiming
+        G_r = view.with_retiming(retiming)
         # 2.2) Run CP algorithm to compute delta_v array for each vertex of the graph
         delta = delta_array(G_r)
-        # print(delta)
-        # 2.3) For each vertex v such that delta(v), increase retiming(v) by 1
-        for v, delta_v in delta.items():
-            if delta_v > desired_clock:
-                retiming[v] += 1
-    if cp_algorithm(G_r) > desired_clock:
-        if verbose:
-            print(f"No feasible retiming exists for clock period {desired_clock}")
-        return None
-    else:
-        if verbose:
-            print(f"Feasible retiming exists with clock period {desired_clock}, and retiming: {retiming}")
-        return retiming
+        late_vertices = [v for v, delta_v in delta.items() if delta_v > desired_clock]
+        # If no vertex exceeds the desired clock the retiming won't change anymore, so stop early
+        if not late_vertices:
+            if verbose:
+                print(f"Feasible retiming exists with clock period {desired_clock}, and retiming: {retiming}")
+            return retiming
+        # 2.3) For each vertex v such that delta(v) > desired_clock, increase retiming(v) by 1
+        for v in late_vertices:
+            retiming[v] += 1
+    if verbose:
+        print(f"No feasible retiming exists for clock period {desired_clock}")
+    return None
 
 def _opt2_binary_search(graph, vectorized_d, verbose=False):
     """
@@ -42,6 +52,10 @@ def _opt2_binary_search(graph, vectorized_d, verbose=False):
     :param verbose: True  [False] to enable [disable] verbosity
     :return: Optimal retiming
     """
+    # The clock period of the graph is always feasible with the zero retiming: as a last candidate it keeps the search
+    # in range when no value of D is feasible, which happens when D is not the one of the paper (see
+    # paper_wd_algorithm) and misses the optimum
+    vectorized_d = np.union1d(vectorized_d, [cp_algorithm(graph)])
     left, right = 0, len(vectorized_d) - 1
     retiming = {}
     while left <= right:
@@ -56,29 +70,108 @@ def _opt2_binary_search(graph, vectorized_d, verbose=False):
     return retiming[left], vectorized_d[left]
 
 
-def opt2_algorithm(graph, draw=False, verbose=False):
+def stream_d_values(graph):
     """
-    Optimal retiming computation for a directed graph
+    Sorted distinct values of the D matrix without building it: a single source search per vertex, with edge length
+    d(u), gives one row of D at a time, whose values are merged into a set. Working memory is O(V + E) plus the
+    distinct values, which are far fewer than V^2 when delays are small integers. Small integer delays (up to
+    DIAL_MAX_WEIGHT, as for select_wd_method) use the bucket queue searches of dial_rows, whose cost grows with the
+    delays, other delays a Dijkstra reading the lengths from the node delays
+    :param graph: directed retiming graph
+    :return: sorted array of the distinct values of D
+    """
+    values = set()
+    delays_array = node_delays(graph)
+    if _small_integers(delays_array):
+        tails, heads, _, tail_delays = edge_arrays(graph)
+        for source, row in dial_rows(len(graph.nodes), tails, heads, tail_delays):
+            # D(source, v) also accounts for the delay of v
+            values.update(length + delays_array[v] for v, length in enumerate(row) if length is not None)
+        return np.array(sorted(values))
+    delays = nx.get_node_attributes(graph, "delay")
+    for source in graph.nodes:
+        lengths = nx.single_source_dijkstra_path_length(graph, source, weight=lambda u, v, e: delays[u])
+        # D(source, v) also accounts for the delay of v
+        values.update(length + delays[v] for v, length in lengths.items())
+    return np.array(sorted(values))
+
+
+def _opt2_range_bisection(graph, verbose=False):
+    """
+    Bisection with FEAS over the integers between the largest delay (lower bound) and the clock period of the graph
+    (upper bound, reached by the zero retiming), for integer delays. It needs no candidate set at all
     :param graph: directed retiming graph
-    :param draw: True if we want to draw the retimed graph
     :param verbose: True  [False] to enable [disable] verbosity
-    :return: the retimed graph
+    :return: Optimal retiming and clock
     """
+    if not all(float(delay).is_integer() for _, delay in graph.nodes(data="delay")):
+        raise ValueError("candidates='range' needs integer delays")
+    lower_bound = max(delay for _, delay in graph.nodes(data="delay"))
+    upper_bound = cp_algorithm(graph)
+    best_retiming = {v: 0 for v in graph.nodes}
+    while lower_bound < upper_bound:
+        clock = (lower_bound + upper_bound) // 2
+        retiming = feas_algorithm(graph, clock, verbose)
+        if retiming is None:
+            lower_bound = clock + 1
+        else:
+            best_retiming, upper_bound = retiming, clock
     if verbose:
-        print("Computing optimal retiming with OPT2 algorithm")
+        print(f"The minimum achievable clock period is {upper_bound}")
+    return best_retiming, upper_bound
+
 
-    # 1) Compute W and D using algorithm WD
-    _, d_mat = wd_algorithm(graph, verbose=verbose)
-    # 2) Sort the elements in the range of D
-    vectorized_d = np.unique(np.sort(d_mat.flatten()))
-    vectorized_d = vectorized_d[~np.isnan(vectorized_d)]
+def opt2_retiming(graph, d_mat=None, verbose=False, candidates="stream"):
+    """
+    Optimal retiming and clock period with OPT2, without building the retimed graph
+    :param graph: directed retiming graph
+    :param d_mat: D matrix, if already computed with WD algorithm, its values are the candidate clocks
+    :param verbose: True  [False] to enable [disable] verbosity
+    :param candidates: candidate clocks when d_mat is not given:
+                       'stream' for the distinct values of D streamed by stream_d_values, in O(V + E) memory
+                       'matrix' for the distinct values of the D matrix of WD algorithm, in O(V^2) memory
+                       'range' to bisect over every integer between the largest delay and the clock period of the
+                       graph (integer delays only): it finds the smallest feasible integer clock, which is never
+                       larger than the smallest feasible value of D
+    :return: optimal retiming dictionary and optimal clock
+    """
+    if d_mat is None and candidates == "range":
+        return _opt2_range_bisection(graph, verbose)
+    # 1) Compute W and D using algorithm WD, or just stream the values of D
+    if d_mat is None and candidates == "stream":
+        vectorized_d = stream_d_values(graph)
+    elif d_mat is None and candidates == "matrix":
+        _, d_mat = wd_algorithm(graph, verbose=verbose)
+    elif d_mat is None:
+        raise ValueError("candidates can be either 'stream', 'matrix' or 'range'")
+    if d_mat is not None:
+        # 2) Sort the elements in the range of D
+        vectorized_d = np.unique(np.sort(d_mat.flatten()))
+        vectorized_d = vectorized_d[~np.isnan(vectorized_d)]
 
     # 3) Binary search among the elements of D for the minimum available clock period, chek correctness with feas
-    retiming, optimal_clock = _opt2_binary_search(graph, vectorized_d, verbose)
+    return _opt2_binary_search(graph, vectorized_d, verbose)
+
+
+def opt2_algorithm(graph, draw=False, verbose=False, certificate=False, candidates="stream"):
+    """
+    Optimal retiming computation for a directed graph
+    :param graph: directed retiming graph
+    :param draw: True if we want to draw the retimed graph
+    :param verbose: True  [False] to enable [disable] verbosity
+    :param certificate: True to also return a certificate of the result, see algorithms.certificates
+    :param candidates: 'stream' | 'matrix' | 'range', how candidate clocks are generated, see opt2_retiming
+    :return: the retimed graph and optimal clock, and the certificate if requested
+    """
+    if verbose:
+        print("Computing optimal retiming with OPT2 algorithm")
+    retiming, optimal_clock = opt2_retiming(graph, verbose=verbose, candidates=candidates)
 
     # 4) Compute the retimed graph using the optimal solution from step 4
     G_r = compute_retimed_graph(graph, retiming)
 
     if draw:
         draw_retiming_graph(G_r)
+    if certificate:
+        return G_r, optimal_clock, retiming_certificate(graph, retiming, optimal_clock)
     return G_r, optimal_clock
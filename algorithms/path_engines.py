@@ -0,0 +1,320 @@
+from collections import deque
+
+import numpy as np
+
+
+def edge_arrays(graph):
+    """
+    Extract the edges of a retiming graph as numpy arrays, so that the all pairs engines can work on plain arrays
+    instead of networkx dictionaries. Nodes must be labelled with integers 0, ..., n-1, as in the rest of the project
+    :param graph: directed retiming graph
+    :return: tails, heads, register weights w(e) and tail delays d(u) of every edge
+    """
+    n_edges = graph.number_of_edges()
+    tails = np.empty(n_edges, dtype=int)
+    heads = np.empty(n_edges, dtype=int)
+    weights = np.empty(n_edges)
+    for index, (u, v, weight) in enumerate(graph.edges(data="weight")):
+        tails[index], heads[index], weights[index] = u, v, weight
+    delays = node_delays(graph)
+    return tails, heads, weights, delays[tails]
+
+
+def node_delays(graph):
+    """
+    Get the delay array of a retiming graph, indexed by node
+    :param graph: directed retiming graph
+    :return: array of delays d(v)
+    """
+    delays = np.zeros(len(graph.nodes))
+    for v, delay in graph.nodes(data="delay"):
+        delays[v] = delay
+    return delays
+
+
+# Maximum number of elements of the temporary array used by a chunk of a min-plus product
+MIN_PLUS_BUFFER_SIZE = 2 ** 20
+
+
+def _min_plus(left, right, out):
+    """
+    In place min-plus product out = min(out, left (x) right), computed a chunk of rows at a time so that the
+    (..., chunk, b, n) temporary stays small
+    :param left: array (..., m, b)
+    :param right: array (..., b, n)
+    :param out: array (..., m, n) updated in place
+    """
+    chunk_size = max(1, MIN_PLUS_BUFFER_SIZE // max(1, right.size))
+    for start in range(0, left.shape[-2], chunk_size):
+        stop = start + chunk_size
+        candidates = (left[..., start:stop, :, None] + right[..., None, :, :]).min(axis=-2)
+        np.minimum(out[..., start:stop, :], candidates, out=out[..., start:stop, :])
+
+
+def floyd_warshall_closure(dist, block_size=64):
+    """
+    Blocked Floyd-Warshall on a (stack of) distance matrices. For each block K of intermediate vertices:
+    1) the diagonal block is closed with the plain Floyd-Warshall recurrence
+    2) the row and column panels of K are relaxed through the closed diagonal block
+    3) every other entry is relaxed with the min-plus product of the column and row panels
+    Leading dimensions of dist are treated as a batch, so that several matrices (e.g. W and D) are closed at once
+    :param dist: array (..., n, n) of edge lengths, np.inf where there is no edge and 0 on the diagonal. Modified in place
+    :param block_size: size of the vertex blocks, tuned to keep a (block, block, n) temporary in cache
+    :return: dist, containing all pairs shortest path lengths
+    """
+    n = dist.shape[-1]
+    for start in range(0, n, block_size):
+        block = slice(start, min(start + block_size, n))
+        # 1) Close the diagonal block
+        diagonal = dist[..., block, block]
+        for k in range(diagonal.shape[-1]):
+            np.minimum(diagonal, diagonal[..., :, k, None] + diagonal[..., None, k, :], out=diagonal)
+        # 2) Relax row and column panels through the diagonal block
+        _min_plus(diagonal, dist[..., block, :].copy(), dist[..., block, :])
+        _min_plus(dist[..., :, block].copy(), diagonal, dist[..., :, block])
+        # 3) Relax the remaining entries through the panels
+        _min_plus(dist[..., :, block].copy(), dist[..., block, :].copy(), dist)
+    return dist
+
+
+def floyd_warshall_all_pairs(n_nodes, tails, heads, lengths, block_size=64):
+    """
+    All pairs shortest path lengths through a NumPy vectorized, blocked Floyd-Warshall
+    :param n_nodes: number of nodes of the graph
+    :param tails: array of edges' tails
+    :param heads: array of edges' heads
+    :param lengths: array (..., n_edges) of edge lengths, one row per matrix to compute
+    :param block_size: size of the vertex blocks
+    :return: array (..., n_nodes, n_nodes) of shortest path lengths, np.inf for unreachable pairs
+    """
+    lengths = np.asarray(lengths, dtype=float)
+    dist = np.full(lengths.shape[:-1] + (n_nodes, n_nodes), np.inf)
+    dist[..., tails, heads] = lengths
+    diagonal = np.arange(n_nodes)
+    dist[..., diagonal, diagonal] = 0
+    return floyd_warshall_closure(dist, block_size=block_size)
+
+
+def _adjacency_lists(n_nodes, tails, heads, lengths):
+    """
+    Build plain Python successor lists [(v, length), ...] for every node, the fastest structure to scan from a
+    Python level search loop
+    :param n_nodes: number of nodes of the graph
+    :param tails: array of edges' tails
+    :param heads: array of edges' heads
+    :param lengths: array of edge lengths
+    :return: list of successor lists, indexed by node
+    """
+    successors = [[] for _ in range(n_nodes)]
+    for u, v, length in zip(tails.tolist(), heads.tolist(), lengths.tolist()):
+        successors[u].append((v, length))
+    return successors
+
+
+def _zero_one_bfs(successors, source, n_nodes):
+    """
+    Single source shortest path lengths for edge lengths in {0, 1} with a double ended queue: 0 length edges push
+    their head in front, 1 length edges at the back, so that nodes are popped in non decreasing distance order
+    :param successors: successor lists from _adjacency_lists
+    :param source: source node
+    :param n_nodes: number of nodes of the graph
+    :return: list of distances, None for unreachable nodes
+    """
+    dist = [None] * n_nodes
+    dist[source] = 0
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        dist_u = dist[u]
+        for v, length in successors[u]:
+            dist_v = dist_u + length
+            if dist[v] is None or dist_v < dist[v]:
+                dist[v] = dist_v
+                if length == 0:
+                    queue.appendleft(v)
+                else:
+                    queue.append(v)
+    return dist
+
+
+def _dial(successors, source, n_nodes, max_length):
+    """
+    Single source shortest path lengths for small non-negative integer edge lengths with Dial's algorithm: a circular
+    array of max_length + 1 buckets replaces the heap, since all tentative distances lie in [d, d + max_length]
+    :param successors: successor lists from _adjacency_lists
+    :param source: source node
+    :param n_nodes: number of nodes of the graph
+    :param max_length: maximum edge length
+    :return: list of distances, None for unreachable nodes
+    """
+    n_buckets = max_length + 1
+    buckets = [[] for _ in range(n_buckets)]
+    dist = [None] * n_nodes
+    dist[source] = 0
+    buckets[0].append(source)
+    pending, current = 1, 0
+    while pending:
+        bucket = buckets[current % n_buckets]
+        while bucket:
+            u = bucket.pop()
+            pending -= 1
+            # Skip stale entries, left behind when the node was moved to a smaller distance
+            if dist[u] != current:
+                continue
+            for v, length in successors[u]:
+                dist_v = current + length
+                if dist[v] is None or dist_v < dist[v]:
+                    dist[v] = dist_v
+                    buckets[dist_v % n_buckets].append(v)
+                    pending += 1
+        current += 1
+    return dist
+
+
+def dial_rows(n_nodes, tails, heads, lengths):
+    """
+    Shortest path lengths from every source, one row at a time, for small non-negative integer edge lengths: one
+    O(V + E + V max_length) bucket queue search per source, with 0-1 BFS when lengths are at most 1 and Dial's
+    algorithm otherwise. Only one row is alive at a time, so consumers that reduce the rows need O(V + E) memory
+    :param n_nodes: number of nodes of the graph
+    :param tails: array of edges' tails
+    :param heads: array of edges' heads
+    :param lengths: array of non-negative integer edge lengths
+    :return: generator of (source, list of distances with None for unreachable nodes)
+    """
+    lengths = np.asarray(lengths)
+    if len(lengths) and ((lengths < 0).any() or (lengths != np.round(lengths)).any()):
+        raise ValueError("Bucket queue searches need non-negative integer edge lengths")
+    lengths = lengths.astype(int)
+    max_length = int(lengths.max(initial=0))
+    successors = _adjacency_lists(n_nodes, tails, heads, lengths)
+    for source in range(n_nodes):
+        if max_length <= 1:
+            yield source, _zero_one_bfs(successors, source, n_nodes)
+        else:
+            yield source, _dial(successors, source, n_nodes, max_length)
+
+
+def dial_all_pairs(n_nodes, tails, heads, lengths):
+    """
+    All pairs shortest path lengths for small non-negative integer edge lengths, see dial_rows
+    :param n_nodes: number of nodes of the graph
+    :param tails: array of edges' tails
+    :param heads: array of edges' heads
+    :param lengths: array of non-negative integer edge lengths
+    :return: array (n_nodes, n_nodes) of shortest path lengths, np.inf for unreachable pairs
+    """
+    dist = np.full((n_nodes, n_nodes), np.inf)
+    for source, row in dial_rows(n_nodes, tails, heads, lengths):
+        reached = [v for v in range(n_nodes) if row[v] is not None]
+        dist[source, reached] = [row[v] for v in reached]
+    return dist
+
+
+def zero_weight_paths(n_nodes, tails, heads, weights, node_weights):
+    """
+    For every node, the largest sum of node_weights along a path of zero-weight edges ending in it, computed in
+    topological order of the zero-weight subgraph (Kahn's algorithm). With the delays as node weights this is the
+    delta array of the CP algorithm, with unit node weights the level of the node in the zero-weight subgraph, plus one
+    :param n_nodes: number of nodes of the graph
+    :param tails: array of edges' tails
+    :param heads: array of edges' heads
+    :param weights: array of edge weights
+    :param node_weights: array of node weights
+    :return: array of path sums, indexed by node
+    """
+    zero = weights == 0
+    successors = _adjacency_lists(n_nodes, tails[zero], heads[zero], weights[zero])
+    indegree = np.bincount(heads[zero], minlength=n_nodes).tolist()
+    node_weights = node_weights.tolist()
+    paths = list(node_weights)
+    stack = [v for v in range(n_nodes) if indegree[v] == 0]
+    processed = 0
+    while stack:
+        u = stack.pop()
+        processed += 1
+        for v, _ in successors[u]:
+            paths[v] = max(paths[v], paths[u] + node_weights[v])
+            indegree[v] -= 1
+            if indegree[v] == 0:
+                stack.append(v)
+    if processed < n_nodes:
+        raise ValueError("The zero-weight subgraph has a cycle, path sums are unbounded")
+    return np.array(paths)
+
+
+def bellman_ford_potentials(n_nodes, tails, heads, lengths, dist=None):
+    """
+    Bellman-Ford from a virtual source linked with 0 length edges to every node, as used to solve the difference
+    constraints of retiming, relaxing all the edges at once with numpy. Edges are grouped by head once, so that each
+    round is a single minimum.reduceat. Leading dimensions of lengths and dist are treated as a batch of constraint
+    systems on the same edges; inactive edges of a system can be given an infinite length
+    :param n_nodes: number of nodes
+    :param tails: array of edge tails
+    :param heads: array of edge heads
+    :param lengths: array (..., m) of edge lengths
+    :param dist: initial potentials (..., n) to warm start from, None for all zeros. They must be lengths of actual
+                 paths from the virtual source, e.g. the solution of a subset of the constraints
+    :return: shortest distances (..., n) and boolean array (...) telling which systems have no negative cycle
+    """
+    lengths = np.asarray(lengths, dtype=float)
+    batch_shape = lengths.shape[:-1]
+    dist = np.zeros(batch_shape + (n_nodes,)) if dist is None else np.array(dist, dtype=float)
+    feasible = np.ones(batch_shape, dtype=bool)
+    if len(tails) == 0:
+        return dist, feasible
+    order = np.argsort(heads, kind="stable")
+    tails, heads, lengths = tails[order], heads[order], lengths[..., order]
+    targets, starts = np.unique(heads, return_index=True)
+    # Without negative cycles shortest paths have at most n - 1 edges, so n rounds changing something prove one
+    for _ in range(n_nodes):
+        candidates = np.minimum.reduceat(dist[..., tails] + lengths, starts, axis=-1)
+        improved = candidates < dist[..., targets]
+        changed = improved.any(axis=-1)
+        if not changed.any():
+            break
+        dist[..., targets] = np.where(improved, candidates, dist[..., targets])
+    else:
+        feasible = ~changed
+    return dist, feasible
+
+
+def negative_cycle(n_nodes, tails, heads, lengths):
+    """
+    Find a negative cycle with Bellman-Ford from a virtual source linked with 0 length edges to every node, tracking
+    the edge each node was last relaxed through. A node still relaxed at round n has a chain of n predecessors relaxed
+    in the previous rounds, so walking back n steps from it lands on a cycle of the predecessor graph, which is negative
+    :param n_nodes: number of nodes
+    :param tails: array of edge tails
+    :param heads: array of edge heads
+    :param lengths: array of edge lengths
+    :return: list of edge indices of a negative cycle, in path order; None if there are none
+    """
+    lengths = np.asarray(lengths, dtype=float)
+    if len(tails) == 0:
+        return None
+    order = np.argsort(heads, kind="stable")
+    targets, starts = np.unique(heads[order], return_index=True)
+    group = np.repeat(np.arange(len(targets)), np.diff(np.append(starts, len(order))))
+    dist = np.zeros(n_nodes)
+    predecessor = np.full(n_nodes, -1)
+    for _ in range(n_nodes):
+        candidates = dist[tails[order]] + lengths[order]
+        best = np.minimum.reduceat(candidates, starts)
+        improved = best < dist[targets]
+        if not improved.any():
+            return None
+        # Any edge realizing the minimum of an improved node is a valid predecessor
+        relaxed = np.flatnonzero(improved[group] & (candidates == best[group]))
+        predecessor[heads[order[relaxed]]] = order[relaxed]
+        dist[targets[improved]] = best[improved]
+    v = targets[improved][0]
+    for _ in range(n_nodes):
+        v = tails[predecessor[v]]
+    cycle, u = [], v
+    while True:
+        cycle.append(predecessor[u])
+        u = tails[predecessor[u]]
+        if u == v:
+            break
+    return [int(e) for e in reversed(cycle)]
@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+
+from algorithms.opt1 import opt1_retiming
+from algorithms.opt2 import opt2_retiming
+from utils.retiming_utils import compute_retimed_graph, draw_retiming_graph
+
+RETIMING_ALGORITHMS = {"opt1": opt1_retiming, "opt2": opt2_retiming}
+
+
+def _solve_component(component_graph, algorithm="opt1", verbose=False):
+    """
+    Solve a strongly connected component on its own. WD indexes its matrices by node, so the component is relabelled
+    to 0, ..., k-1 before solving and the retiming is mapped back to the original labels
+    :param component_graph: subgraph induced by the component
+    :param algorithm: 'opt1' | 'opt2'
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: retiming dictionary of the component and its optimal clock
+    """
+    labels = sorted(component_graph.nodes)
+    relabelled = nx.relabel_nodes(component_graph, {v: index for index, v in enumerate(labels)})
+    retiming, optimal_clock = RETIMING_ALGORITHMS[algorithm](relabelled, verbose=verbose)
+    return {labels[index]: r for index, r in retiming.items()}, optimal_clock
+
+
+def decompose_scc(graph):
+    """
+    Split a retiming graph into its strongly connected components. Only components with a cycle constrain the clock
+    in a nontrivial way: every other vertex can always be isolated by registers on its edges
+    :param graph: directed retiming graph
+    :return: condensation DAG (node attribute 'members') and list of nontrivial components
+    """
+    condensation = nx.condensation(graph)
+    nontrivial = [members for _, members in condensation.nodes(data="members") if len(members) > 1]
+    return condensation, nontrivial
+
+
+def stitch_retimings(graph, condensation, retiming):
+    """
+    Stitch the retimings of the single components into a retiming of the whole graph, in linear time. Components are
+    shifted by a constant offset in topological order of the condensation, so that every edge between two components
+    gets at least one register: combinational paths then never cross components, and each component keeps its clock
+    :param graph: directed retiming graph
+    :param condensation: condensation DAG of the graph, from decompose_scc
+    :param retiming: retiming of the vertices of the nontrivial components, missing vertices are considered 0
+    :return: retiming dictionary of the whole graph
+    """
+    component_of = condensation.graph["mapping"]
+    weights = nx.get_edge_attributes(graph, "weight")
+    stitched = {}
+    for component in nx.topological_sort(condensation):
+        members = condensation.nodes[component]["members"]
+        # w(e) + R(v) - R(u) >= 1 for every edge u -> v entering the component, with R(v) = r(v) + offset
+        offset = max([stitched[u] - retiming.get(v, 0) - weights[u, v] + 1
+                      for v in members for u, _ in graph.in_edges(v) if component_of[u] != component], default=0)
+        for v in members:
+            stitched[v] = retiming.get(v, 0) + offset
+    return stitched
+
+
+def scc_opt_algorithm(graph, algorithm="opt1", n_jobs=None, draw=False, verbose=False):
+    """
+    Optimal retiming through strongly connected component decomposition: each nontrivial component is solved on its
+    own with OPT1 or OPT2, in parallel over a process pool when there is more than one, then the feed-forward part of
+    the graph is handled by stitch_retimings. The optimal clock is the largest between the components' optimal clocks
+    and the largest delay, and WD only needs the sum of the squared component sizes instead of |V|^2 memory
+    :param graph: directed retiming graph
+    :param algorithm: 'opt1' | 'opt2', algorithm used on every component
+    :param n_jobs: number of worker processes, None to use all the CPUs, 1 to solve components sequentially
+    :param draw: True if we want to draw the retimed graph
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: retimed graph and optimal clock
+    """
+    if algorithm not in RETIMING_ALGORITHMS:
+        raise ValueError("algorithm can be either 'opt1' or 'opt2'")
+    # 1) Decompose the graph into strongly connected components
+    condensation, nontrivial = decompose_scc(graph)
+    if verbose:
+        print(f"Solving {len(nontrivial)} nontrivial strongly connected components out of {len(condensation)}")
+
+    # 2) Solve each nontrivial component independently
+    subgraphs = [graph.subgraph(members).copy() for members in nontrivial]
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+    if n_jobs > 1 and len(subgraphs) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(subgraphs))) as executor:
+            solutions = list(executor.map(_solve_component, subgraphs, [algorithm] * len(subgraphs),
+                                          [verbose] * len(subgraphs)))
+    else:
+        solutions = [_solve_component(subgraph, algorithm, verbose) for subgraph in subgraphs]
+
+    # 3) The clock is bounded by every component and by every single vertex delay
+    retiming = {}
+    optimal_clock = max(delay for _, delay in graph.nodes(data="delay"))
+    for component_retiming, component_clock in solutions:
+        retiming.update(component_retiming)
+        optimal_clock = max(optimal_clock, component_clock)
+
+    # 4) Stitch the components' retimings along the condensation
+    G_r = compute_retimed_graph(graph, stitch_retimings(graph, condensation, retiming))
+    if verbose:
+        print(f"The minimum achievable clock period is {optimal_clock}")
+    if draw:
+        draw_retiming_graph(G_r)
+    return G_r, optimal_clock
@@ -1,5 +1,12 @@
 import numpy as np
 import networkx as nx
+from algorithms.path_engines import edge_arrays, node_delays, floyd_warshall_all_pairs, dial_all_pairs, \
+    bellman_ford_potentials
+
+# Edge density |E| / (|V| (|V| - 1)) above which the Floyd-Warshall backend is used by wd_algorithm
+DENSE_GRAPH_THRESHOLD = 0.1
+# Maximum integer register weight and node delay for which the bucket queue backend is used by wd_algorithm
+DIAL_MAX_WEIGHT = 16
 
 
 def set_wd_attributes(graph):
@@ -22,7 +29,105 @@ def set_wd_attributes(graph):
     nx.set_edge_attributes(graph, new_attributes)
 
 
-def wd_algorithm(graph, verbose=True):
+def _small_integers(values):
+    """
+    Check whether all values are integers in [0, DIAL_MAX_WEIGHT]
+    :param values: iterable of weights or delays
+    :return: True | False
+    """
+    values = np.fromiter(values, dtype=float)
+    return bool(((values >= 0) & (values <= DIAL_MAX_WEIGHT) & (values == np.round(values))).all())
+
+
+def select_wd_method(graph):
+    """
+    Choose the all pairs shortest path backend for WD. Dijkstra from every source is O(V E log V) with a Python level
+    heap: Floyd-Warshall is O(V^3) but vectorized, so it wins on dense graphs, while on sparse graphs whose register
+    weights and delays are small integers bucket queues make every search O(V + E)
+    :param graph: directed retiming graph
+    :return: 'floyd_warshall' | 'dial' | 'dijkstra'
+    """
+    n_nodes = len(graph.nodes)
+    if n_nodes > 1 and graph.number_of_edges() / (n_nodes * (n_nodes - 1)) >= DENSE_GRAPH_THRESHOLD:
+        return "floyd_warshall"
+    if _small_integers(w for _, _, w in graph.edges(data="weight")) and \
+            _small_integers(d for _, d in graph.nodes(data="delay")):
+        return "dial"
+    return "dijkstra"
+
+
+def _wd_floyd_warshall(graph):
+    """
+    Compute the W and D matrices by closing both the (W, d(u)) length matrices with a blocked Floyd-Warshall
+    :param graph: directed retiming graph
+    :return: W and D matrices
+    """
+    tails, heads, weights, tail_delays = edge_arrays(graph)
+    w_mat, d_mat = floyd_warshall_all_pairs(len(graph.nodes), tails, heads, np.stack((weights, tail_delays)))
+    # D(u, v) also accounts for the delay of v
+    d_mat += node_delays(graph)[None, :]
+    w_mat[np.isinf(w_mat)], d_mat[np.isinf(d_mat)] = np.nan, np.nan
+    return w_mat, d_mat
+
+
+def _wd_dial(graph):
+    """
+    Compute the W and D matrices with bucket queue searches (0-1 BFS or Dial's algorithm), for integer weights and delays
+    :param graph: directed retiming graph
+    :return: W and D matrices
+    """
+    tails, heads, weights, tail_delays = edge_arrays(graph)
+    w_mat = dial_all_pairs(len(graph.nodes), tails, heads, weights)
+    d_mat = dial_all_pairs(len(graph.nodes), tails, heads, tail_delays) + node_delays(graph)[None, :]
+    w_mat[np.isinf(w_mat)], d_mat[np.isinf(d_mat)] = np.nan, np.nan
+    return w_mat, d_mat
+
+
+def lexicographic_graph(graph):
+    """
+    Graph whose shortest paths minimize the registers first and maximize the delay second: every edge u -> v gets the
+    length w(e) * M - d(u), with M larger than the delay of any path. These lengths can be negative, so they are
+    reweighted with Bellman-Ford potentials h as in Johnson's algorithm (there are no negative cycles, as every cycle
+    has a register) into the non negative attribute 'lex', and a path of 'lex' length L has length L - h(u) + h(v)
+    :param graph: directed retiming graph
+    :return: reweighted graph, potentials h and M
+    """
+    tails, heads, weights, tail_delays = edge_arrays(graph)
+    big_m = np.abs(node_delays(graph)).sum() + 1
+    lengths = weights * big_m - tail_delays
+    potentials, feasible = bellman_ford_potentials(len(graph.nodes), tails, heads, lengths)
+    if not feasible:
+        raise ValueError("The graph has a cycle with 0 weight")
+    reduced = np.maximum(lengths + potentials[tails] - potentials[heads], 0)
+    lex_graph = nx.DiGraph()
+    lex_graph.add_nodes_from(graph.nodes)
+    lex_graph.add_weighted_edges_from(zip(tails.tolist(), heads.tolist(), reduced.tolist()), weight="lex")
+    return lex_graph, potentials, big_m
+
+
+def paper_wd_algorithm(graph, verbose=False):
+    """
+    Compute W and D with the definition of Leierson - Saxe paper: D(u, v) is the maximum delay of the paths from u to v
+    with W(u, v) registers. wd_algorithm's D is instead the minimum delay over all the paths from u to v, which is
+    never larger. A shortest path of lexicographic_graph from u has length W(u, v) * M - s, where s is the delay of
+    the path without v
+    :param graph: directed retiming graph
+    :param verbose: True for prints, False to skip prints
+    :return: W and D matrices
+    """
+    if verbose:
+        print("Computing W and D matrices of the paper")
+    lex_graph, potentials, big_m = lexicographic_graph(graph)
+    delays = node_delays(graph)
+    lengths = np.full((len(graph.nodes), len(graph.nodes)), np.nan)
+    for u, dist in nx.all_pairs_dijkstra_path_length(lex_graph, weight="lex"):
+        lengths[u, list(dist.keys())] = np.array(list(dist.values())) - potentials[u] + potentials[list(dist.keys())]
+    w_mat = np.ceil(lengths / big_m - 1e-9)
+    d_mat = w_mat * big_m - lengths + delays[None, :]
+    return w_mat, d_mat
+
+
+def wd_algorithm(graph, method="auto", verbose=True):
     """
     Compute the W and D matrices through Djikstra algorithm
 
@@ -31,11 +136,24 @@ def wd_algorithm(graph, verbose=True):
     D(u,v) = d(v) - w_d(u, v)
 
     :param graph: directed retiming graph
+    :param method: 'auto' | 'dijkstra' | 'floyd_warshall' | 'dial', all pairs shortest path backend. 'auto' picks it from
+    the density and the weights of the graph (see select_wd_method); all backends return the same matrices
     :param verbose: True for prints, False to skip prints
     :return: W and D matrices
     """
     if verbose:
         print("Computing W and D matrices")
+    if method == "auto":
+        method = select_wd_method(graph)
+    if method in ("floyd_warshall", "dial"):
+        w_mat, d_mat = _wd_floyd_warshall(graph) if method == "floyd_warshall" else _wd_dial(graph)
+        if verbose:
+            print(w_mat)
+            print(d_mat)
+        return w_mat, d_mat
+    if method != "dijkstra":
+        raise ValueError("method can be either 'auto', 'dijkstra', 'floyd_warshall' or 'dial'")
+
     # Set d(u) attribute as edge attribute
     set_wd_attributes(graph)
 
@@ -0,0 +1,143 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+# Functions that mark a stage of the retiming algorithms: a sample belongs to the innermost one on its stack
+STAGES = ["wd_algorithm", "check_legal_retiming", "bellman_ford_potentials", "feas_algorithm", "compute_retimed_graph",
+          "delta_array", "cp_algorithm", "draw_retiming_graph"]
+
+
+class StageProfiler:
+    def __init__(self, interval=0.005, stages=STAGES):
+        """
+        Low overhead sampling profiler: a background thread reads the stack of the profiled thread every interval
+        seconds, so the algorithms run unmodified and the cost does not depend on how many calls they make.
+        Every sample is tagged with its algorithm stage, the innermost function of stages on the stack, and the
+        samples are reported as collapsed stacks (the input of flamegraph.pl, speedscope, ...) and as a hot function
+        table
+        :param interval: sampling interval in seconds
+        :param stages: names of the functions that mark a stage
+        """
+        self.interval = interval
+        self.stages = set(stages)
+        self.stacks = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            stack.reverse()
+            stage = next((name.split(":")[1] for name in reversed(stack) if name.split(":")[1] in self.stages), "other")
+            self.stacks[tuple([stage] + stack)] += 1
+
+    def start(self):
+        """
+        Start sampling the calling thread
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop sampling
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def collapsed_stacks(self):
+        """
+        :return: list of collapsed stack lines 'stage;frame;...;frame count', root first
+        """
+        return [f"{';'.join(stack)} {count}" for stack, count in sorted(self.stacks.items())]
+
+    def stage_samples(self):
+        """
+        :return: Counter {stage: number of samples}
+        """
+        samples = Counter()
+        for stack, count in self.stacks.items():
+            samples[stack[0]] += count
+        return samples
+
+    def hot_functions(self, top=20):
+        """
+        Functions with the most samples
+        :param top: number of functions to return
+        :return: list of (function, self samples, total samples, stage of most self samples) sorted by self samples
+        """
+        own, total, stages = Counter(), Counter(), {}
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            stages.setdefault(stack[-1], Counter())[stack[0]] += count
+            for name in set(stack[1:]):
+                total[name] += count
+        return [(name, own[name], total[name], stages[name].most_common(1)[0][0])
+                for name, _ in own.most_common(top)]
+
+    def report(self, top=20):
+        """
+        :param top: number of hot functions in the table
+        :return: text report with the samples per stage and the hot function table
+        """
+        n_samples = max(1, sum(self.stacks.values()))
+        lines = [f"{sum(self.stacks.values())} samples every {self.interval * 1000:g} ms", "", "Stage samples:"]
+        for stage, count in self.stage_samples().most_common():
+            lines.append(f"{count:>8} {100 * count / n_samples:6.1f}%  {stage}")
+        lines += ["", f"{'self':>8} {'self %':>7} {'total':>8}  {'stage':<24} function"]
+        for name, own, total, stage in self.hot_functions(top):
+            lines.append(f"{own:>8} {100 * own / n_samples:6.1f}% {total:>8}  {stage:<24} {name}")
+        return "\n".join(lines)
+
+    def save(self, output_dir, name="profile", top=20, verbose=False):
+        """
+        Write the collapsed stacks to <name>.folded and the report to <name>.txt
+        :param output_dir: output directory, created if missing
+        :param name: base name of the files
+        :param top: number of hot functions in the table
+        :param verbose: True  [False] to enable [disable] verbosity
+        :return: paths of the flamegraph and of the report file
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        folded_path, report_path = os.path.join(output_dir, f"{name}.folded"), os.path.join(output_dir, f"{name}.txt")
+        with open(folded_path, "w") as file:
+            file.write("\n".join(self.collapsed_stacks()) + "\n")
+        report = self.report(top)
+        with open(report_path, "w") as file:
+            file.write(report + "\n")
+        if verbose:
+            print(report)
+            print(f"Flamegraph stacks saved to {folded_path}")
+        return folded_path, report_path
+
+
+def profile_call(function, *args, output_dir="profiles", name=None, interval=0.005, top=20, verbose=True, **kwargs):
+    """
+    Run a function under the StageProfiler and save its flamegraph stacks and hot function table
+    :param function: function to profile, e.g. opt2_algorithm
+    :param args: positional arguments of function
+    :param output_dir: output directory
+    :param name: base name of the output files, the function name by default
+    :param interval: sampling interval in seconds
+    :param top: number of hot functions in the table
+    :param verbose: True  [False] to enable [disable] verbosity
+    :param kwargs: keyword arguments of function
+    :return: return value of function
+    """
+    with StageProfiler(interval=interval) as profiler:
+        result = function(*args, **kwargs)
+    profiler.save(output_dir, name=name or function.__name__, top=top, verbose=verbose)
+    return result
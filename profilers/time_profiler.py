@@ -1,8 +1,11 @@
 from time import time
+from algorithms.multilevel import multilevel_algorithm
 from algorithms.opt1 import opt1_algorithm
 from algorithms.opt2 import opt2_algorithm
 from algorithms.wd_algorithm import wd_algorithm
 from retiming.RetimingGraphRandom import RetimingGraphRandom
+from retiming.workload_corpus import load_workload
+from profilers.stage_profiler import profile_call
 from utils.retiming_utils import plot_dictionary
 
 
@@ -183,3 +186,37 @@ def multiple_time_random_graph_instantiation(node_list=[10, 20, 50, 100, 200, 50
         plot_dictionary(delta_times)
 
     return delta_times
+
+
+def multiple_time_workload(family="correlator", node_list=[10, 100, 1000, 10000], algorithm="opt1", seed=0, verbose=False, plot=True,
+                           profile_dir=None):
+    """
+    Compute and plots time benchmarks for an algorithm over graphs of a workload corpus family of increasing size
+    :param family: ring | correlator | systolic | netlist
+    :param node_list: list of nodes of the graphs on which the benchmark will be run
+    :param algorithm: wd | opt1 | opt2 | multilevel
+    :param seed: seed of the workload graphs
+    :param verbose: True  [False] to enable [disable] verbosity
+    :param plot: True to plot on a graph the memory usages as the number of nodes grows
+    :param profile_dir: directory where the stage profile of every run is saved, None to disable profiling
+    :return: dictionary {n_nodes: delta_time}
+    """
+    algorithms = {"wd": wd_algorithm, "opt1": opt1_algorithm, "opt2": opt2_algorithm,
+                  "multilevel": multilevel_algorithm}
+    delta_times = {}
+    for n in node_list:
+        g = load_workload(family, n, seed=seed, verbose=verbose)
+        start_time = time()
+        if profile_dir is None:
+            algorithms[algorithm](g.graph)
+        else:
+            profile_call(algorithms[algorithm], g.graph, output_dir=profile_dir, name=f"{algorithm}_{family}_{n}",
+                         verbose=verbose)
+        delta_times[n] = time() - start_time
+        if verbose:
+            print(f"Time to execute algorithm {algorithm} on {family} graph with {n} nodes: {delta_times[n]}")
+
+    if plot:
+        plot_dictionary(delta_times)
+
+    return delta_times
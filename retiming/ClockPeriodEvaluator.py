@@ -0,0 +1,126 @@
+import heapq
+
+from algorithms.cp_algorithm import delta_array
+from retiming.RetimedGraphView import RetimedGraphView
+from utils.retiming_utils import compute_retimed_graph
+
+
+class ClockPeriodEvaluator:
+    def __init__(self, graph, retiming=None):
+        """
+        Stateful clock period evaluator for what-if retimings. It holds the retimed weights and the delta array of a
+        retiming graph: when the retiming of a few vertices changes, delta(v) is recomputed only on the downstream cone
+        of the zero-weight subgraph G_0 reachable from the edges whose weight became or stopped being zero, and the
+        clock period is kept in a lazy max-heap, so every update costs time proportional to the change
+        :param graph: directed retiming graph, it is not modified
+        :param retiming: initial retiming dictionary, None for the zero retiming
+        """
+        self.graph = graph
+        self.delays = dict(graph.nodes(data="delay"))
+        self.retiming = {v: 0 for v in graph.nodes}
+        if retiming is not None:
+            self.retiming.update(retiming)
+        self.weights = {(u, v): weight + self.retiming[v] - self.retiming[u]
+                        for u, v, weight in graph.edges(data="weight")}
+        # Edges with a negative retimed weight, a retiming is legal only if there are none
+        self._negative_edges = {e for e, weight in self.weights.items() if weight < 0}
+        self.delta = delta_array(RetimedGraphView(graph, self.retiming))
+        self._heap = [(-delta_v, v) for v, delta_v in self.delta.items()]
+        heapq.heapify(self._heap)
+
+    @property
+    def clock_period(self):
+        """
+        :return: clock period of the current retimed graph, i.e. the maximum of the delta array
+        """
+        # Discard stale heap entries, left behind by vertices whose delta changed since they were pushed
+        while -self._heap[0][0] != self.delta[self._heap[0][1]]:
+            heapq.heappop(self._heap)
+        return -self._heap[0][0]
+
+    @property
+    def is_legal(self):
+        """
+        :return: True if every retimed edge weight is non-negative
+        """
+        return not self._negative_edges
+
+    def _set_weight(self, e, weight, seeds):
+        """
+        Update the retimed weight of an edge, collecting its head as a seed if it entered or left G_0
+        :param e: edge (u, v)
+        :param weight: new retimed weight
+        :param seeds: set of vertices whose delta must be recomputed
+        """
+        if (self.weights[e] == 0) != (weight == 0):
+            seeds.add(e[1])
+        self.weights[e] = weight
+        if weight < 0:
+            self._negative_edges.add(e)
+        else:
+            self._negative_edges.discard(e)
+
+    def _propagate(self, seeds):
+        """
+        Recompute delta on the cone of G_0 reachable from the seeds, in topological order (Kahn's algorithm restricted
+        to the cone): vertices outside of it keep both their zero-weight in-edges and their predecessors' delta
+        :param seeds: vertices whose zero-weight in-edges changed
+        """
+        # 1) Collect the downstream cone in G_0
+        cone, stack = set(seeds), list(seeds)
+        while stack:
+            u = stack.pop()
+            for _, v in self.graph.out_edges(u):
+                if self.weights[u, v] == 0 and v not in cone:
+                    cone.add(v)
+                    stack.append(v)
+        # 2) Topological order of the cone
+        in_degree = {v: sum(1 for u, _ in self.graph.in_edges(v) if u in cone and self.weights[u, v] == 0)
+                     for v in cone}
+        ready = [v for v, degree in in_degree.items() if degree == 0]
+        processed = 0
+        while ready:
+            v = ready.pop()
+            processed += 1
+            # 3) delta(v) = d(v) + max delta(u) over zero-weight edges u -> v
+            delta_v = self.delays[v] + max([self.delta[u] for u, _ in self.graph.in_edges(v)
+                                            if self.weights[u, v] == 0], default=0)
+            if delta_v != self.delta[v]:
+                self.delta[v] = delta_v
+                heapq.heappush(self._heap, (-delta_v, v))
+            for _, x in self.graph.out_edges(v):
+                if x in cone and self.weights[v, x] == 0:
+                    in_degree[x] -= 1
+                    if in_degree[x] == 0:
+                        ready.append(x)
+        if processed < len(cone):
+            raise ValueError("The retiming creates a cycle with 0 weight, its clock period is unbounded")
+
+    def apply(self, retiming_deltas):
+        """
+        Change the retiming of some vertices and return the new clock period
+        :param retiming_deltas: dictionary {v: k}, retiming(v) is increased by k
+        :return: clock period after the change
+        """
+        seeds = set()
+        for v, k in retiming_deltas.items():
+            if k == 0:
+                continue
+            self.retiming[v] += k
+            # w_r(u, v) = w(u, v) + r(v) - r(u): incoming edges gain k registers, outgoing ones lose k
+            for u, _ in self.graph.in_edges(v):
+                self._set_weight((u, v), self.weights[u, v] + k, seeds)
+            for _, x in self.graph.out_edges(v):
+                self._set_weight((v, x), self.weights[v, x] - k, seeds)
+        self._propagate(seeds)
+        # Rebuild the heap when stale entries dominate it
+        if len(self._heap) > 4 * len(self.delta):
+            self._heap = [(-delta_v, v) for v, delta_v in self.delta.items()]
+            heapq.heapify(self._heap)
+        return self.clock_period
+
+    def retimed_graph(self):
+        """
+        :return: materialized retimed graph of the current retiming
+        """
+        return compute_retimed_graph(self.graph, self.retiming)
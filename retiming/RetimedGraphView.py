@@ -0,0 +1,166 @@
+import copy
+
+import networkx as nx
+import numpy as np
+
+from algorithms.path_engines import zero_weight_paths
+
+
+class RetimedGraphView:
+    def __init__(self, graph, retiming=None):
+        """
+        Read-only view of the retimed graph G_r of a retiming graph, without copying it: the edges are stored once as
+        arrays, and the retimed weights w_r(u, v) = w(u, v) + r(v) - r(u) are computed with numpy when needed. Views of
+        other retimings of the same graph (with_retiming) share the arrays, so a what-if check only costs a retiming
+        array. It is not a networkx graph: delta_array and cp_algorithm accept it in place of a retimed graph, and
+        feas_algorithm, anytime_algorithm, ClockPeriodEvaluator and verify_certificate use it internally; nodes,
+        len and edges (see RetimedEdgeView) read it like a networkx graph, but adjacency (graph[u], in_edges,
+        successors) is not provided. materialize builds the networkx graph that compute_retimed_graph would return,
+        for any other consumer
+        :param graph: directed retiming graph, nodes labelled 0, ..., n-1, it is not modified
+        :param retiming: retiming dictionary or array indexed by node, None for the zero retiming
+        """
+        self.graph = graph
+        n_nodes = len(graph.nodes)
+        edges = list(graph.edges(data="weight"))
+        self.tails = np.array([u for u, _, _ in edges], dtype=int)
+        self.heads = np.array([v for _, v, _ in edges], dtype=int)
+        self.base_weights = np.array([weight for _, _, weight in edges])
+        delays = [0] * n_nodes
+        for v, delay in graph.nodes(data="delay"):
+            delays[v] = delay
+        self.delays = np.array(delays)
+        self.retiming = self._retiming_array(retiming)
+        # Filled on first use of edges[u, v], the same dictionary object is shared by the views of other retimings
+        self._edge_positions = {}
+
+    def _retiming_array(self, retiming):
+        """
+        Retiming as an integer array indexed by node
+        """
+        if retiming is None:
+            return np.zeros(len(self.delays), dtype=int)
+        if isinstance(retiming, dict):
+            return np.array([retiming[v] for v in range(len(self.delays))], dtype=int)
+        return np.asarray(retiming, dtype=int)
+
+    def with_retiming(self, retiming):
+        """
+        View of another retiming of the same graph, sharing the edge and delay arrays
+        :param retiming: retiming dictionary or array indexed by node
+        :return: RetimedGraphView object
+        """
+        view = copy.copy(self)
+        view.retiming = self._retiming_array(retiming)
+        return view
+
+    @property
+    def weights(self):
+        """
+        :return: array of retimed weights w_r(e), in the order of the tails and heads arrays
+        """
+        return self.base_weights + self.retiming[self.heads] - self.retiming[self.tails]
+
+    @property
+    def nodes(self):
+        return self.graph.nodes
+
+    @property
+    def edges(self):
+        """
+        :return: RetimedEdgeView of the retimed edges, used like the edges of a networkx graph
+        """
+        return RetimedEdgeView(self)
+
+    def _edge_index(self):
+        """
+        Position of every edge in the tails and heads arrays, built on first use and shared with_retiming
+        """
+        if not self._edge_positions:
+            self._edge_positions.update(zip(zip(self.tails.tolist(), self.heads.tolist()), range(len(self.tails))))
+        return self._edge_positions
+
+    def __len__(self):
+        return len(self.delays)
+
+    @property
+    def is_legal(self):
+        """
+        :return: True if every retimed edge weight is non-negative
+        """
+        return not (self.weights < 0).any()
+
+    @property
+    def registers(self):
+        """
+        :return: number of registers of the retimed graph, the sum of the retimed weights
+        """
+        return self.weights.sum().item()
+
+    def delta(self):
+        """
+        :return: delta array of the retimed graph, indexed by node (see delta_array)
+        """
+        try:
+            return zero_weight_paths(len(self.delays), self.tails, self.heads, self.weights, self.delays)
+        except ValueError:
+            # Same error as the topological sort of delta_array on a materialized graph
+            raise nx.NetworkXUnfeasible("Graph contains a cycle with 0 weight")
+
+    def materialize(self):
+        """
+        :return: the retimed graph as a new networkx DiGraph, equal to compute_retimed_graph(graph, retiming)
+        """
+        G_r = nx.DiGraph()
+        G_r.add_weighted_edges_from(self.edges(data="weight"))
+        G_r.add_nodes_from((v, {"delay": delay}) for v, delay in self.graph.nodes(data="delay"))
+        return G_r
+
+
+class RetimedEdgeView:
+    def __init__(self, view):
+        """
+        Edges of a RetimedGraphView, with the subset of the networkx edge view interface that reads them: iteration
+        over (u, v) pairs, len, membership, edges[u, v] for the attribute dictionary and edges(data=...) for the
+        edge tuples. The retimed weights are computed once per view object
+        :param view: RetimedGraphView object
+        """
+        self._view = view
+        self._weights = None
+
+    def _weight_list(self):
+        if self._weights is None:
+            self._weights = self._view.weights.tolist()
+        return self._weights
+
+    def __iter__(self):
+        return zip(self._view.tails.tolist(), self._view.heads.tolist())
+
+    def __len__(self):
+        return len(self._view.tails)
+
+    def __contains__(self, edge):
+        return tuple(edge) in self._view._edge_index()
+
+    def __getitem__(self, edge):
+        """
+        :param edge: (u, v) pair
+        :return: attribute dictionary {'weight': w_r(u, v)}, a new one at every call since the view is read-only
+        """
+        return {"weight": self._weight_list()[self._view._edge_index()[tuple(edge)]]}
+
+    def __call__(self, data=False, default=None):
+        """
+        Edge tuples, as networkx edges(data=...) gives them
+        :param data: False for (u, v), True for (u, v, {'weight': w_r(u, v)}), an attribute name for (u, v, value),
+                     where only 'weight' is defined
+        :param default: value of the attributes other than 'weight'
+        :return: list of edge tuples
+        """
+        pairs = list(self)
+        if data is False:
+            return pairs
+        if data is True:
+            return [(u, v, {"weight": weight}) for (u, v), weight in zip(pairs, self._weight_list())]
+        values = self._weight_list() if data == "weight" else [default] * len(pairs)
+        return [(u, v, value) for (u, v), value in zip(pairs, values)]
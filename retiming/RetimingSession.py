@@ -0,0 +1,232 @@
+import networkx as nx
+import numpy as np
+
+from algorithms.path_engines import bellman_ford_potentials, edge_arrays, node_delays
+from algorithms.wd_algorithm import wd_algorithm
+from utils.retiming_utils import compute_retimed_graph, draw_retiming_graph
+
+
+class RetimingSession:
+    def __init__(self, retiming_graph, verbose=False):
+        """
+        Incremental OPT1 session on top of a RetimingGraph. The W and D matrices are computed once, then every edit
+        (delay change, edge insertion or deletion, weight change) only updates the rows and columns it affects:
+        - a shorter edge can only shorten paths through it, so all pairs are relaxed in one vectorized step
+          dist(x, y) = min(dist(x, y), dist(x, u) + length(u, v) + dist(v, y))
+        - a longer (or deleted) edge can only lengthen the pairs whose shortest path used it, so only the sources of
+          those pairs are recomputed with single source Dijkstra
+        The clock search then starts from the previous optimal clock, and every Bellman-Ford run is warm started from
+        the potentials of a feasible larger clock of the same search.
+        :param retiming_graph: RetimingGraph object, its graph is copied so the original one is never modified
+        :param verbose: True  [False] to enable [disable] verbosity
+        """
+        self.graph = retiming_graph.graph.copy()
+        self.verbose = verbose
+        self.delays = node_delays(self.graph)
+
+        w_mat, d_mat = wd_algorithm(self.graph, verbose=False)
+        # Shortest path lengths with register weights, and with d(u) lengths (D without the delay of the last node)
+        self._w_dist = np.where(np.isnan(w_mat), np.inf, w_mat)
+        self._d_dist = np.where(np.isnan(d_mat), np.inf, d_mat - self.delays[None, :])
+
+        self.retiming = None
+        self.optimal_clock = None
+
+    @property
+    def w_mat(self):
+        """
+        :return: W matrix of the current graph, as returned by wd_algorithm
+        """
+        return np.where(np.isinf(self._w_dist), np.nan, self._w_dist)
+
+    @property
+    def d_mat(self):
+        """
+        :return: D matrix of the current graph, as returned by wd_algorithm
+        """
+        return np.where(np.isinf(self._d_dist), np.nan, self._d_dist + self.delays[None, :])
+
+    def _recompute_rows(self, dist, sources, length):
+        """
+        Recompute some rows of a distance matrix with single source Dijkstra on the current graph
+        :param dist: distance matrix to update in place
+        :param sources: rows to recompute
+        :param length: networkx weight, either an edge attribute name or a function (u, v, data) -> length
+        """
+        for source in sources:
+            lengths = nx.single_source_dijkstra_path_length(self.graph, source, weight=length)
+            dist[source, :] = np.inf
+            dist[source, list(lengths.keys())] = list(lengths.values())
+
+    @staticmethod
+    def _tight_sources(dist, u, v, length):
+        """
+        Rows of dist for which some shortest path uses the edge (u, v) with the given length
+        :param dist: distance matrix
+        :param u: tail of the edge
+        :param v: head of the edge
+        :param length: current length of the edge
+        :return: set of sources whose row may change if the edge gets longer
+        """
+        through_edge = dist[:, u, None] + length + dist[None, v, :]
+        tight = (through_edge == dist) & np.isfinite(dist)
+        return set(np.nonzero(tight.any(axis=1))[0].tolist())
+
+    @staticmethod
+    def _relax(dist, u, v, length):
+        """
+        Update a distance matrix in place after the edge (u, v) got shorter (or was inserted) with the given length
+        :param dist: distance matrix
+        :param u: tail of the edge
+        :param v: head of the edge
+        :param length: new length of the edge
+        """
+        np.minimum(dist, dist[:, u, None] + length + dist[None, v, :], out=dist)
+
+    def _d_length(self, u, v, data):
+        """
+        Edge length used for the D matrix: the delay of the tail
+        """
+        return self.delays[u]
+
+    def set_delay(self, v, delay):
+        """
+        Change the propagation delay of a node: all its outgoing edges change d(u) length, and its D column shifts
+        :param v: node
+        :param delay: new delay d(v), non-negative
+        """
+        assert delay >= 0
+        old_delay = self.delays[v]
+        out_edges = list(self.graph.out_edges(v))
+        if delay < old_delay:
+            for _, x in out_edges:
+                self._relax(self._d_dist, v, x, delay)
+            self.delays[v] = delay
+        elif delay > old_delay:
+            sources = set()
+            for _, x in out_edges:
+                sources |= self._tight_sources(self._d_dist, v, x, old_delay)
+            self.delays[v] = delay
+            self._recompute_rows(self._d_dist, sources, self._d_length)
+        self.graph.nodes[v]["delay"] = delay
+
+    def set_weight(self, u, v, weight):
+        """
+        Change the register count of an existing edge
+        :param u: tail of the edge
+        :param v: head of the edge
+        :param weight: new register count w(e), non-negative
+        """
+        assert weight >= 0
+        old_weight = self.graph.edges[u, v]["weight"]
+        if weight == 0 and self._w_dist[v, u] == 0:
+            raise AssertionError("Detected a cycle with 0 weight")
+        if weight < old_weight:
+            self._relax(self._w_dist, u, v, weight)
+            self.graph.edges[u, v]["weight"] = weight
+        elif weight > old_weight:
+            sources = self._tight_sources(self._w_dist, u, v, old_weight)
+            self.graph.edges[u, v]["weight"] = weight
+            self._recompute_rows(self._w_dist, sources, "weight")
+
+    def add_edge(self, u, v, weight):
+        """
+        Insert a new edge, only shortening paths
+        :param u: tail of the edge
+        :param v: head of the edge
+        :param weight: register count w(e), non-negative
+        """
+        assert weight >= 0
+        assert not self.graph.has_edge(u, v)
+        if weight == 0 and self._w_dist[v, u] == 0:
+            raise AssertionError("Detected a cycle with 0 weight")
+        self.graph.add_edge(u, v, weight=weight)
+        self._relax(self._w_dist, u, v, weight)
+        self._relax(self._d_dist, u, v, self.delays[u])
+
+    def remove_edge(self, u, v):
+        """
+        Delete an edge, only lengthening the paths that used it
+        :param u: tail of the edge
+        :param v: head of the edge
+        """
+        w_sources = self._tight_sources(self._w_dist, u, v, self.graph.edges[u, v]["weight"])
+        d_sources = self._tight_sources(self._d_dist, u, v, self.delays[u])
+        self.graph.remove_edge(u, v)
+        self._recompute_rows(self._w_dist, w_sources, "weight")
+        self._recompute_rows(self._d_dist, d_sources, self._d_length)
+
+    def optimize(self, draw=False):
+        """
+        OPT1 clock search on the current graph. Instead of a plain binary search over the sorted values of D, it
+        gallops away from the previous optimal clock, which after a local edit is usually a few candidates away.
+        As in clock_sweep, the constraints of a clock are a subset of the ones of any smaller clock, so every
+        feasibility check warm starts Bellman-Ford from the potentials of the closest larger candidate found feasible
+        so far in this search
+        :param draw: True if we want to draw the retimed graph
+        :return: retimed graph and optimal clock
+        """
+        w_mat, d_mat = self.w_mat, self.d_mat
+        vectorized_d = np.unique(d_mat[~np.isnan(d_mat)])
+        n_nodes = len(self.graph.nodes)
+        tails, heads, weights, _ = edge_arrays(self.graph)
+        # Pairs by decreasing D, so that the type 2 constraints of a clock are a prefix; r(u) - r(v) <= b is the
+        # constraint edge v -> u of length b
+        pairs_u, pairs_v = np.nonzero(~np.isnan(d_mat))
+        order = np.argsort(-d_mat[pairs_u, pairs_v], kind="stable")
+        pairs_u, pairs_v = pairs_u[order], pairs_v[order]
+        pairs_d = d_mat[pairs_u, pairs_v]
+        constraint_tails = np.concatenate((heads, pairs_v))
+        constraint_heads = np.concatenate((tails, pairs_u))
+        constraint_lengths = np.concatenate((weights, w_mat[pairs_u, pairs_v] - 1))
+        retimings = {}
+
+        def feasible(index):
+            if index not in retimings:
+                warm = [i for i, dist in retimings.items() if i > index and dist is not None]
+                n_active = len(weights) + np.count_nonzero(pairs_d > vectorized_d[index])
+                dist, is_feasible = bellman_ford_potentials(n_nodes, constraint_tails[:n_active],
+                                                            constraint_heads[:n_active],
+                                                            constraint_lengths[:n_active],
+                                                            dist=retimings[min(warm)] if warm else None)
+                retimings[index] = dist if is_feasible else None
+                if self.verbose:
+                    print(f"Clock period {vectorized_d[index]}: " + ("feasible" if is_feasible else "infeasible"))
+            return retimings[index] is not None
+
+        # 1) Start from the candidate closest to the previous optimum, from the middle one for the first search
+        if self.optimal_clock is None:
+            start = (len(vectorized_d) - 1) // 2
+        else:
+            start = min(int(np.searchsorted(vectorized_d, self.optimal_clock)), len(vectorized_d) - 1)
+        # 2) Gallop towards the boundary between infeasible and feasible clocks to bracket it in (left, right]
+        step = 1
+        if feasible(start):
+            left, right = start - 1, start
+            while left >= 0 and feasible(left):
+                right, left = left, left - step
+                step *= 2
+            left = max(left, -1)
+        else:
+            left, right = start, start + 1
+            while right < len(vectorized_d) - 1 and not feasible(right):
+                left, right = right, min(right + step, len(vectorized_d) - 1)
+                step *= 2
+        # 3) Binary search inside the bracket
+        while right - left > 1:
+            mid = (left + right) // 2
+            if feasible(mid):
+                right = mid
+            else:
+                left = mid
+
+        # The largest candidate is assumed feasible while galloping, make sure its retiming has been computed
+        feasible(right)
+        self.retiming = dict(enumerate(retimings[right].astype(int).tolist()))
+        self.optimal_clock = vectorized_d[right]
+        if self.verbose:
+            print(f"The minimum achievable clock period is {self.optimal_clock}")
+        G_r = compute_retimed_graph(self.graph, self.retiming)
+        if draw:
+            draw_retiming_graph(G_r)
+        return G_r, self.optimal_clock
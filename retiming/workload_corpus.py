@@ -0,0 +1,157 @@
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from retiming.RetimingGraph import RetimingGraph
+
+"""
+Parametric, seeded families of retiming graphs for scaling studies. Every generator is vectorized with numpy so that
+graphs of 10 to 10^6 vertices can be produced, and returns a workload dictionary of arrays:
+delays (one per node, node 0 is the host with delay 0), tails, heads and weights (one per edge).
+Every cycle goes through an edge carrying at least one register, so condition W2 always holds and no cycle check is
+needed when instantiating the graph.
+"""
+
+
+def _workload(delays, tails, heads, weights):
+    return {"delays": np.asarray(delays, dtype=int), "tails": np.asarray(tails, dtype=int),
+            "heads": np.asarray(heads, dtype=int), "weights": np.asarray(weights, dtype=int)}
+
+
+def ring_workload(n_nodes, seed=0):
+    """
+    Single cycle 0 -> 1 -> ... -> n-1 -> 0, with at least one register on the host edge
+    :param n_nodes: number of nodes
+    :param seed: random seed
+    :return: workload dictionary
+    """
+    rng = np.random.default_rng(seed)
+    tails = np.arange(n_nodes)
+    heads = (tails + 1) % n_nodes
+    weights = rng.integers(0, 2, size=n_nodes)
+    weights[-1] = max(weights[-1], 1)
+    delays = np.concatenate(([0], rng.integers(1, 10, size=n_nodes - 1)))
+    return _workload(delays, tails, heads, weights)
+
+
+def correlator_workload(n_nodes, seed=0):
+    """
+    Correlator as in Leierson - Saxe paper, generalized to k = n_nodes // 2 taps: a chain of k comparators
+    (delay 3) with one register per edge, k - 1 adders (delay 7) chained without registers, comparator k - m feeding
+    adder k + m, and the adder chain feeding back to the host. With 8 nodes it is exactly the paper graph
+    :param n_nodes: number of nodes, rounded down to an even number of at least 4
+    :param seed: unused, the family is deterministic; kept for a uniform interface
+    :return: workload dictionary
+    """
+    taps = max(2, n_nodes // 2)
+    adders = np.arange(taps + 1, 2 * taps)
+    m = np.arange(1, taps)
+    tails = np.concatenate((np.arange(taps), [taps], taps - m, adders[:-1], [adders[-1]]))
+    heads = np.concatenate((np.arange(1, taps + 1), [adders[0]], taps + m, adders[1:], [0]))
+    weights = np.concatenate((np.ones(taps, dtype=int), np.zeros(len(tails) - taps, dtype=int)))
+    delays = np.concatenate(([0], np.full(taps, 3), np.full(taps - 1, 7)))
+    return _workload(delays, tails, heads, weights)
+
+
+def systolic_workload(n_nodes, seed=0):
+    """
+    Systolic array: a rows x cols grid of processing elements, each passing data right (with or without a register)
+    and down (always with a register), fed by the host into the top-left element and feeding back to the host from
+    the bottom-right one
+    :param n_nodes: number of nodes, the grid is the largest near-square one with at most n_nodes - 1 elements
+    :param seed: random seed
+    :return: workload dictionary
+    """
+    rng = np.random.default_rng(seed)
+    rows = max(1, int(np.sqrt(n_nodes - 1)))
+    cols = max(1, (n_nodes - 1) // rows)
+    grid = 1 + np.arange(rows * cols).reshape(rows, cols)
+    right_tails, right_heads = grid[:, :-1].ravel(), grid[:, 1:].ravel()
+    down_tails, down_heads = grid[:-1, :].ravel(), grid[1:, :].ravel()
+    tails = np.concatenate(([0], right_tails, down_tails, [grid[-1, -1]]))
+    heads = np.concatenate(([grid[0, 0]], right_heads, down_heads, [0]))
+    weights = np.concatenate(([1], rng.integers(0, 2, size=len(right_tails)), np.ones(len(down_tails), dtype=int),
+                              [0]))
+    delays = np.concatenate(([0], rng.integers(1, 10, size=rows * cols)))
+    return _workload(delays, tails, heads, weights)
+
+
+def netlist_workload(n_nodes, seed=0, fanin=2, window=32, feedback_probability=0.05):
+    """
+    Sparse netlist-like graph: a DAG where every gate reads fanin signals from the window of gates before it (mostly
+    combinational, sometimes registered), with a few registered feedback edges to earlier gates and the host driving
+    the first gate and reading the last one
+    :param n_nodes: number of nodes
+    :param seed: random seed
+    :param fanin: number of inputs of every gate
+    :param window: locality window of the gates' inputs
+    :param feedback_probability: probability that a gate has a feedback edge
+    :return: workload dictionary
+    """
+    rng = np.random.default_rng(seed)
+    gates = np.arange(2, n_nodes)
+    # Forward edges: inputs drawn from the previous gates in the window, duplicates removed
+    tails = np.maximum(1, gates[:, None] - rng.integers(1, window + 1, size=(len(gates), fanin))).ravel()
+    heads = np.repeat(gates, fanin)
+    pairs = np.unique(tails * n_nodes + heads)
+    tails, heads = pairs // n_nodes, pairs % n_nodes
+    weights = (rng.random(len(tails)) < 0.2).astype(int)
+    # Feedback edges to an earlier gate, always registered
+    sources = gates[rng.random(len(gates)) < feedback_probability]
+    targets = rng.integers(1, np.maximum(sources, 2))
+    tails = np.concatenate(([0], tails, sources, [n_nodes - 1]))
+    heads = np.concatenate(([1], heads, targets, [0]))
+    weights = np.concatenate(([1], weights, rng.integers(1, 3, size=len(sources)), [1]))
+    delays = np.concatenate(([0], rng.integers(1, 10, size=n_nodes - 1)))
+    return _workload(delays, tails, heads, weights)
+
+
+WORKLOAD_FAMILIES = {"ring": ring_workload, "correlator": correlator_workload, "systolic": systolic_workload,
+                     "netlist": netlist_workload}
+
+
+def workload_graph(workload, verbose=False):
+    """
+    Instantiate the RetimingGraph of a workload, without cycle check nor clockwise edges removal
+    :param workload: workload dictionary
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: RetimingGraph object
+    """
+    edges = np.column_stack((workload["tails"], workload["heads"]))
+    return RetimingGraph(list(range(len(workload["delays"]))), edges, workload["delays"], workload["weights"],
+                         positive_cycle_check=False, remove_clockwise_edges=False, verbose=verbose)
+
+
+def load_workload(family, n_nodes, seed=0, cache_dir=".workload_cache", verbose=False):
+    """
+    Get a workload graph, generating it only if it is not already cached as a binary .npz file. Unreadable cache files
+    are regenerated, and writes go to a temporary file renamed over the final one
+    :param family: one of WORKLOAD_FAMILIES
+    :param n_nodes: number of nodes
+    :param seed: random seed
+    :param cache_dir: cache directory, None to disable caching
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: RetimingGraph object
+    """
+    if family not in WORKLOAD_FAMILIES:
+        raise ValueError(f"family can be one of {', '.join(WORKLOAD_FAMILIES)}")
+    if cache_dir is None:
+        return workload_graph(WORKLOAD_FAMILIES[family](n_nodes, seed=seed), verbose=verbose)
+
+    path = os.path.join(cache_dir, f"{family}_{n_nodes}_{seed}.npz")
+    try:
+        with np.load(path) as data:
+            workload = {key: data[key] for key in ["delays", "tails", "heads", "weights"]}
+        if verbose:
+            print(f"Loaded cached workload {path}")
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        # Missing, truncated, corrupted or foreign file: generate the workload again and overwrite it
+        workload = WORKLOAD_FAMILIES[family](n_nodes, seed=seed)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file and rename it, so that concurrent benchmarks never read a partial file
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as file:
+            np.savez(file, **workload)
+        os.replace(file.name, path)
+    return workload_graph(workload, verbose=verbose)
@@ -1,10 +1,21 @@
 import argparse
+import numpy as np
 from profilers.time_profiler import *
 from profilers.mem_profiler import *
 from tests.cp_tests import *
 from tests.opt1_2_test import *
+from tests.differential_fuzzing import fuzz
 from retiming.RetimingGraph import RetimingGraph
 from algorithms.wd_algorithm import wd_algorithm
+from algorithms.anytime import anytime_algorithm
+from algorithms.clock_sweep import clock_register_pareto
+from algorithms.delay_batch import delay_batch_algorithm
+from algorithms.correlator import correlator_opt_algorithm
+from algorithms.multilevel import multilevel_algorithm
+from algorithms.min_area import min_area_algorithm
+from algorithms.graph_reduction import reduced_opt_algorithm
+from profilers.stage_profiler import StageProfiler
+from utils.result_store import ResultStore, cached_opt_algorithm
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -20,6 +31,22 @@ if __name__ == "__main__":
     parser.add_argument("--random_opt1", action='store_true', help="Test OPT1 algorithm on a random graph")
     parser.add_argument("--random_opt2", action='store_true', help="Test OPT2 algorithm on a random graph")
     parser.add_argument("--random_wd", action='store_true', help="Test wd algorithm on a random graph")
+    parser.add_argument("--random_correlator", action='store_true',
+                        help="Test the correlator fast path (OPT1 if the graph does not match) on a random graph")
+    parser.add_argument("--random_multilevel", action='store_true',
+                        help="Test multilevel (coarsen, solve, refine) clock minimization on a random graph")
+    parser.add_argument("--random_anytime", action='store_true',
+                        help="Test anytime clock minimization on a random graph within --time_budget seconds")
+    parser.add_argument("--random_pareto", action='store_true',
+                        help="Clock period versus registers trade-off of the retimings of a random graph")
+    parser.add_argument("--random_delay_batch", action='store_true',
+                        help="Optimal clocks of a random graph for --n_tests random delay vectors, solved as a batch")
+    parser.add_argument("--random_min_area", action='store_true',
+                        help="Minimum register retiming of a random graph for --clock, by default the optimal clock")
+    parser.add_argument("--fuzz", action='store_true',
+                        help="Differential fuzzing of all retiming engines on seeded graphs of several families")
+    parser.add_argument("--fuzz_dir", default="fuzz_failures", type=str,
+                        help="Directory where minimal failing fuzzing cases are saved")
 
     # Performance test parsers
     parser.add_argument("--time_instantiation", action='store_true',
@@ -27,6 +54,10 @@ if __name__ == "__main__":
     parser.add_argument("--time_wd", action='store_true', help="Test time of WD on a list of random graphs")
     parser.add_argument("--time_opt1", action='store_true', help="Test time of OPT1 on a list of random graphs")
     parser.add_argument("--time_opt2", action='store_true', help="Test time of OPT2 on a list of random graphs")
+    parser.add_argument("--time_workload", default=None, type=str,
+                        help="Test time of --algorithm on a list of graphs of a workload family: ring, correlator, "
+                             "systolic or netlist")
+    parser.add_argument("--algorithm", default="opt1", type=str, help="Algorithm to benchmark: wd, opt1, opt2 or multilevel")
 
     parser.add_argument("--memory_instantiation", action='store_true',
                         help="Test memory of instantiation on a list of random graphs")
@@ -34,6 +65,11 @@ if __name__ == "__main__":
     parser.add_argument("--memory_opt1", action='store_true', help="Test memory of OPT1 on a list of random graphs")
     parser.add_argument("--memory_opt2", action='store_true', help="Test memory of OPT2 on a list of random graphs")
 
+    parser.add_argument("--profile", action='store_true',
+                        help="Profile the run with a sampling profiler, saving flamegraph stacks and a hot function "
+                             "table tagged by algorithm stage; with --time_workload every timed call is profiled on "
+                             "its own instead")
+    parser.add_argument("--profile_dir", default="profiles", type=str, help="Directory where profiles are saved")
     parser.add_argument("--plot_performance", action='store_true', help="Plot performance graph")
     # General random graph parameters
     parser.add_argument('--nodes_list', default=[4, 10, 15, 20, 25, 30], nargs='+', type=int,
@@ -46,12 +82,32 @@ if __name__ == "__main__":
 
     parser.add_argument("--n_nodes", default=20, type=int, help="Number of random nodes for a random graph")
     parser.add_argument("--edge_prob", default=0.6, type=float, help="Set edge probability for a random graph")
+    parser.add_argument("--seed", default=None, type=int, help="Random seed of the random graphs")
+    parser.add_argument("--cache_dir", default=None, type=str,
+                        help="Directory of a persistent store of solved retimings used by --random_opt1 and "
+                             "--random_opt2, results are looked up there before solving")
+    parser.add_argument("--reduce", action='store_true',
+                        help="Contract zero-delay pass-through vertices before WD in --random_opt1 and --random_opt2: "
+                             "same optimal clock, the retiming of the contracted vertices is chosen on expansion")
+    parser.add_argument("--clock", default=None, type=float, help="Target clock period of minimum area mode")
+    parser.add_argument("--time_budget", default=10, type=float, help="Time budget in seconds of anytime mode")
+    parser.add_argument("--wd_method", default="auto", type=str,
+                        help="All pairs shortest path backend of WD: auto, dijkstra, floyd_warshall or dial")
 
     # General test variables
     parser.add_argument("--verbose", action='store_true', help="Set verbosity to true")
     parser.add_argument("--draw", action='store_true', help="Draw graphs")
 
     args = parser.parse_args()
+    if args.reduce and args.cache_dir is not None:
+        parser.error("--reduce and --cache_dir cannot be used together")
+    if args.seed is not None:
+        np.random.seed(args.seed)
+
+    # With --time_workload every call is profiled on its own: a second, global sampler would count each stack twice
+    profile_run = args.profile and args.time_workload is None
+    if profile_run:
+        profiler = StageProfiler().start()
 
     if args.weights == "random":
         cycle_check = True
@@ -67,22 +123,70 @@ if __name__ == "__main__":
     if args.random_wd:
         g = RetimingGraphRandom(n_vertices=args.n_nodes, edge_probability=args.edge_prob, weights=args.weights,
                                 verbose=args.verbose)
-        wd_algorithm(g.graph, draw=args.draw, verbose=args.verbose)
+        wd_algorithm(g.graph, method=args.wd_method, verbose=args.verbose)
 
     if args.random_opt1:
         g = RetimingGraphRandom(n_vertices=args.n_nodes, edge_probability=args.edge_prob, weights=args.weights,
                                 verbose=args.verbose)
-        opt1_algorithm(g.graph, draw=args.draw, verbose=args.verbose)
+        if args.reduce:
+            reduced_opt_algorithm(g.graph, algorithm="opt1", draw=args.draw, verbose=args.verbose)
+        elif args.cache_dir is None:
+            opt1_algorithm(g.graph, draw=args.draw, verbose=args.verbose)
+        else:
+            cached_opt_algorithm(g.graph, ResultStore(args.cache_dir), algorithm="opt1", draw=args.draw,
+                                 verbose=args.verbose)
 
     if args.random_opt2:
         g = RetimingGraphRandom(n_vertices=args.n_nodes, edge_probability=args.edge_prob, weights=args.weights,
                                 verbose=args.verbose)
-        opt2_algorithm(g.graph, draw=args.draw, verbose=args.verbose)
+        if args.reduce:
+            reduced_opt_algorithm(g.graph, algorithm="opt2", draw=args.draw, verbose=args.verbose)
+        elif args.cache_dir is None:
+            opt2_algorithm(g.graph, draw=args.draw, verbose=args.verbose)
+        else:
+            cached_opt_algorithm(g.graph, ResultStore(args.cache_dir), algorithm="opt2", draw=args.draw,
+                                 verbose=args.verbose)
+
+    if args.random_correlator:
+        g = RetimingGraphRandom(n_vertices=args.n_nodes, edge_probability=args.edge_prob, weights=args.weights,
+                                verbose=args.verbose)
+        correlator_opt_algorithm(g.graph, draw=args.draw, verbose=args.verbose)
+
+    if args.random_multilevel:
+        g = RetimingGraphRandom(n_vertices=args.n_nodes, edge_probability=args.edge_prob, weights=args.weights,
+                                verbose=args.verbose)
+        multilevel_algorithm(g.graph, draw=args.draw, verbose=args.verbose)
+
+    if args.random_anytime:
+        g = RetimingGraphRandom(n_vertices=args.n_nodes, edge_probability=args.edge_prob, weights=args.weights,
+                                verbose=args.verbose)
+        anytime_algorithm(g.graph, args.time_budget, draw=args.draw, verbose=args.verbose)
+
+    if args.random_pareto:
+        g = RetimingGraphRandom(n_vertices=args.n_nodes, edge_probability=args.edge_prob, weights=args.weights,
+                                verbose=args.verbose)
+        for clock, registers, _ in clock_register_pareto(g.graph, verbose=args.verbose):
+            print(f"Clock period {clock}: {registers} registers")
+
+    if args.random_delay_batch:
+        g = RetimingGraphRandom(n_vertices=args.n_nodes, edge_probability=args.edge_prob, weights=args.weights,
+                                verbose=args.verbose)
+        delays = np.random.randint(1, 10, size=(args.n_tests, args.n_nodes))
+        delays[:, 0] = 0
+        delay_batch_algorithm(g.graph, delays, verbose=True)
+
+    if args.random_min_area:
+        g = RetimingGraphRandom(n_vertices=args.n_nodes, edge_probability=args.edge_prob, weights=args.weights,
+                                verbose=args.verbose)
+        min_area_algorithm(g.graph, clock=args.clock, draw=args.draw, verbose=True)
 
     if args.random_test_opt12:
         random_test_opt1_opt2(n_tests=args.n_tests, n_nodes_list=args.nodes_list, weights=args.weights,
                               verbose=args.verbose)
 
+    if args.fuzz:
+        fuzz(n_cases=args.n_tests, n_nodes_list=args.nodes_list, output_dir=args.fuzz_dir, verbose=True)
+
     # Algorithms performance
     # Time
     if args.time_instantiation:
@@ -104,6 +208,11 @@ if __name__ == "__main__":
                                   positive_cycle_check=cycle_check,
                                   verbose=args.verbose, plot=args.plot_performance)
 
+    if args.time_workload is not None:
+        multiple_time_workload(family=args.time_workload, node_list=args.nodes_list, algorithm=args.algorithm,
+                               verbose=args.verbose, plot=args.plot_performance,
+                               profile_dir=args.profile_dir if args.profile else None)
+
     # Memory
     if args.memory_instantiation:
         multiple_memory_random_graph_instantiation(node_list=args.nodes_list, p=args.edge_prob, weights=args.weights,
@@ -125,3 +234,6 @@ if __name__ == "__main__":
                                     positive_cycle_check=cycle_check,
                                     verbose=args.verbose, plot=args.plot_performance)
 
+    if profile_run:
+        profiler.stop()
+        profiler.save(args.profile_dir, name="runner", verbose=True)
@@ -0,0 +1,35 @@
+import copy
+
+import numpy as np
+from algorithms.certificates import verify_certificate
+from algorithms.opt1 import opt1_algorithm
+from algorithms.opt2 import opt2_algorithm
+from algorithms.wd_algorithm import paper_wd_algorithm, wd_algorithm
+from tests.paper_test_graphs import get_paper_graphs
+
+
+def test_certificates():
+    """
+    Test the certificates of OPT1 and OPT2 on the paper graphs: they verify, while certificates claiming a smaller
+    clock, an illegal retiming or a broken constraint cycle do not
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    for g, test in [(g1, test1), (g2, test2)]:
+        w_mat, d_mat = wd_algorithm(g.graph, verbose=False)
+        paper_w_mat, paper_d_mat = paper_wd_algorithm(g.graph)
+        assert np.array_equal(paper_w_mat, w_mat, equal_nan=True)
+        assert (np.nan_to_num(d_mat) <= np.nan_to_num(paper_d_mat)).all()
+
+        for algorithm in [opt1_algorithm, opt2_algorithm]:
+            _, clock, certificate = algorithm(g.graph, certificate=True)
+            assert clock == test["opt1"] and verify_certificate(g.graph, certificate)
+
+            smaller_clock = copy.deepcopy(certificate)
+            smaller_clock["clock"] = certificate["lower_clock"]
+            assert not verify_certificate(g.graph, smaller_clock)
+            zero_retiming = copy.deepcopy(certificate)
+            zero_retiming["retiming"] = {v: 0 for v in g.graph.nodes}
+            assert not verify_certificate(g.graph, zero_retiming)
+            broken_cycle = copy.deepcopy(certificate)
+            broken_cycle["negative_cycle"] = broken_cycle["negative_cycle"][1:]
+            assert not verify_certificate(g.graph, broken_cycle)
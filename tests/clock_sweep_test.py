@@ -0,0 +1,31 @@
+import networkx as nx
+import numpy as np
+from algorithms.clock_sweep import clock_register_pareto, clock_sweep
+from algorithms.opt1 import check_legal_retiming
+from algorithms.wd_algorithm import wd_algorithm
+from tests.paper_test_graphs import get_paper_graphs
+from utils.retiming_utils import compute_retimed_graph
+
+
+def test_clock_sweep():
+    """
+    Test a sweep over every distinct value of D on the paper graphs: feasibility and retiming must be the ones of
+    check_legal_retiming, the register count the one of the retimed graph, and the smallest feasible clock the OPT1 one
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    for g, test in [(g1, test1), (g2, test2)]:
+        w_mat, d_mat = wd_algorithm(g.graph, verbose=False)
+        clocks = np.unique(d_mat[~np.isnan(d_mat)]).tolist()
+        sweep = clock_sweep(g.graph, clocks, w_mat=w_mat, d_mat=d_mat)
+        for clock in clocks:
+            retiming = check_legal_retiming(g.graph, clock, w_mat, d_mat)
+            assert sweep[clock]["feasible"] == (retiming is not None)
+            if retiming is not None:
+                assert sweep[clock]["retiming"] == {v: int(r) for v, r in retiming.items()}
+                G_r = compute_retimed_graph(g.graph, retiming)
+                assert sweep[clock]["registers"] == sum(nx.get_edge_attributes(G_r, "weight").values())
+        assert min(clock for clock in clocks if sweep[clock]["feasible"]) == test["opt1"]
+
+        front = clock_register_pareto(g.graph, w_mat=w_mat, d_mat=d_mat)
+        assert front[0][0] == test["opt1"]
+        assert all(a[1] > b[1] for a, b in zip(front, front[1:]))
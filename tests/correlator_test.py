@@ -0,0 +1,28 @@
+from algorithms.correlator import correlator_opt_algorithm, is_correlator_shaped
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.opt1 import opt1_retiming
+from algorithms.wd_algorithm import paper_wd_algorithm
+from retiming.workload_corpus import load_workload, netlist_workload, workload_graph
+from tests.paper_test_graphs import get_paper_graphs
+
+
+def test_correlator_fast_path():
+    """
+    Test the correlator fast path on the paper graphs and on correlator and ring workloads against OPT1, and the
+    fall back to OPT1 on a netlist graph
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    graphs = [g1.graph, g2.graph] + [load_workload(family, n_nodes, seed=seed, cache_dir=None).graph
+                                     for family in ["correlator", "ring"] for n_nodes in [8, 20] for seed in range(3)]
+    for g in graphs:
+        assert is_correlator_shaped(g)
+        G_r, clock = correlator_opt_algorithm(g)
+        assert min(weight for _, _, weight in G_r.edges(data="weight")) >= 0
+        assert cp_algorithm(G_r) == clock
+        w_mat, d_mat = paper_wd_algorithm(g)
+        assert clock == opt1_retiming(g, w_mat=w_mat, d_mat=d_mat)[1]
+    assert correlator_opt_algorithm(g1.graph)[1] == test1["opt1"]
+
+    netlist = workload_graph(netlist_workload(20, feedback_probability=0.5)).graph
+    assert not is_correlator_shaped(netlist)
+    assert correlator_opt_algorithm(netlist)[1] == opt1_retiming(netlist)[1]
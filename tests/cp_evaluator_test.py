@@ -0,0 +1,37 @@
+import numpy as np
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.opt1 import opt1_retiming
+from retiming.ClockPeriodEvaluator import ClockPeriodEvaluator
+from retiming.RetimingGraphRandom import RetimingGraphRandom
+from tests.paper_test_graphs import get_paper_graphs
+
+
+def _walk_to_retiming(graph, retiming):
+    """
+    Apply a retiming one vertex at a time, checking the incremental clock period against CP at every step
+    :param graph: directed retiming graph
+    :param retiming: target retiming dictionary
+    :return: the evaluator after the last step
+    """
+    evaluator = ClockPeriodEvaluator(graph)
+    assert evaluator.clock_period == cp_algorithm(graph)
+    for v, r in retiming.items():
+        clock_period = evaluator.apply({v: r})
+        assert clock_period == cp_algorithm(evaluator.retimed_graph())
+    return evaluator
+
+
+def test_clock_period_evaluator():
+    """
+    Test the incremental clock period while moving paper graphs and random graphs to their OPT1 retiming
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    assert ClockPeriodEvaluator(g1.graph).clock_period == test1["clock_period"]
+    assert ClockPeriodEvaluator(g2.graph).clock_period == test2["clock_period"]
+    for graph in [g1.graph, g2.graph]:
+        evaluator = _walk_to_retiming(graph, opt1_retiming(graph)[0])
+        assert evaluator.is_legal
+
+    np.random.seed(3)
+    graph = RetimingGraphRandom(25, edge_probability=0.3, weights="positive").graph
+    _walk_to_retiming(graph, {v: np.random.randint(-2, 3) for v in graph.nodes})
@@ -0,0 +1,25 @@
+import networkx as nx
+import numpy as np
+from algorithms.delay_batch import delay_batch_algorithm
+from algorithms.opt1 import opt1_retiming
+from tests.paper_test_graphs import get_paper_graphs
+
+
+def test_delay_batch():
+    """
+    Test the delay batch mode on the paper graphs with their own delays and random delay vectors: every optimal
+    clock and retiming must be the OPT1 one
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    rng = np.random.default_rng(0)
+    for g, test in [(g1, test1), (g2, test2)]:
+        delays = np.array([g.graph.nodes[v]["delay"] for v in range(len(g.graph.nodes))], dtype=float)
+        batch = np.vstack((delays, rng.integers(0, 10, size=(4, len(delays)))))
+        clocks, retimings = delay_batch_algorithm(g.graph, batch)
+        assert clocks[0] == test["opt1"]
+        for b, delay_vector in enumerate(batch):
+            graph = g.graph.copy()
+            nx.set_node_attributes(graph, dict(enumerate(delay_vector.tolist())), "delay")
+            retiming, clock = opt1_retiming(graph)
+            assert clocks[b] == clock
+            assert retimings[b].tolist() == [retiming[v] for v in range(len(delays))]
@@ -0,0 +1,267 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.correlator import correlator_opt_algorithm
+from algorithms.graph_reduction import reduced_opt_algorithm
+from algorithms.min_area import min_area_algorithm
+from algorithms.multilevel import multilevel_algorithm
+from algorithms.opt1 import opt1_algorithm
+from algorithms.opt2 import opt2_algorithm
+from algorithms.scc_decomposition import scc_opt_algorithm
+from algorithms.wd_algorithm import wd_algorithm
+from retiming.RetimingGraph import RetimingGraph
+from retiming.workload_corpus import WORKLOAD_FAMILIES
+
+# Retiming engines under differential test, all returning (retimed graph, optimal clock). The multilevel engine is a
+# heuristic in general, but fuzzing cases are smaller than coarse_nodes, so that it solves them exactly
+ENGINES = {
+    "opt1": opt1_algorithm,
+    "opt2": opt2_algorithm,
+    "opt2_matrix": lambda graph: opt2_algorithm(graph, candidates="matrix"),
+    "opt2_range": lambda graph: opt2_algorithm(graph, candidates="range"),
+    "scc_opt1": lambda graph: scc_opt_algorithm(graph, n_jobs=1),
+    "reduced_opt1": reduced_opt_algorithm,
+    "correlator_opt": correlator_opt_algorithm,
+    "multilevel": lambda graph: multilevel_algorithm(graph)[:2],
+    "min_area": lambda graph: min_area_algorithm(graph)[:2],
+}
+# Engines whose candidate clocks or constraints come from the D matrix of wd_algorithm, the minimum delay over all the
+# paths instead of the maximum delay of the minimum weight paths of the paper (see paper_wd_algorithm): OPT1 can accept
+# a clock that its retiming does not reach, and OPT2 can miss the optimum among its candidates. Their failures and
+# disagreements are reported apart and do not fail a case, so that the other engines keep a meaningful verdict
+KNOWN_DIVERGENT_ENGINES = {"opt1", "opt2", "opt2_matrix", "scc_opt1", "reduced_opt1", "correlator_opt"}
+# WD backends whose matrices must all be equal
+WD_METHODS = ["dijkstra", "floyd_warshall", "dial"]
+
+
+def _gnp_case(n_nodes, rng):
+    """
+    Random graph with forward edges only plus the host feedback edge (n-1) -> 0, as RetimingGraphRandom generates
+    """
+    edges = [[u, v] for u in range(n_nodes) for v in range(u + 1, n_nodes) if rng.random() < 0.4]
+    weights = rng.integers(0, 3, size=len(edges)).tolist()
+    return edges + [[n_nodes - 1, 0]], weights + [int(rng.integers(1, 3))]
+
+
+def _cyclic_case(n_nodes, rng):
+    """
+    Random graph with edges in both directions: backward edges carry at least one register, so that every cycle does
+    """
+    edges = [[u, v] for u in range(n_nodes) for v in range(n_nodes) if u != v and rng.random() < 0.25]
+    weights = [int(rng.integers(0, 3)) if u < v else int(rng.integers(1, 3)) for u, v in edges]
+    if not edges:
+        # Small graphs may draw no edge at all, keep the host feedback edge
+        return [[n_nodes - 1, 0]], [1]
+    return edges, weights
+
+
+def _ring_case(n_nodes, rng):
+    """
+    Single cycle through all the vertices, with some chords
+    """
+    edges = [[v, (v + 1) % n_nodes] for v in range(n_nodes)]
+    weights = rng.integers(0, 2, size=n_nodes).tolist()
+    weights[-1] = max(weights[-1], 1)
+    chords = [[u, v] for u, v in rng.integers(0, n_nodes, size=(n_nodes // 3, 2)).tolist() if u < v - 1]
+    return edges + chords, weights + [1] * len(chords)
+
+
+def _corpus_case(family):
+    """
+    Case generator drawing edges and weights from a family of the workload corpus
+    """
+    def generate(n_nodes, rng):
+        workload = WORKLOAD_FAMILIES[family](n_nodes, seed=int(rng.integers(2 ** 31)))
+        return np.column_stack((workload["tails"], workload["heads"])).tolist(), workload["weights"].tolist()
+    return generate
+
+
+FAMILIES = {"gnp": _gnp_case, "cyclic": _cyclic_case, "ring": _ring_case, "correlator": _corpus_case("correlator"),
+            "systolic": _corpus_case("systolic"), "netlist": _corpus_case("netlist")}
+
+
+def generate_case(family, n_nodes, seed):
+    """
+    Generate a reproducible fuzzing case
+    :param family: one of FAMILIES
+    :param n_nodes: (approximate) number of nodes
+    :param seed: random seed
+    :return: case dictionary with nodes, edges, delays and weights lists
+    """
+    rng = np.random.default_rng(seed)
+    edges, weights = FAMILIES[family](n_nodes, rng)
+    n_nodes = max(max(edge) for edge in edges) + 1
+    delays = [0] + rng.integers(0, 10, size=n_nodes - 1).tolist()
+    return {"family": family, "seed": seed, "nodes": list(range(n_nodes)), "edges": edges, "delays": delays,
+            "weights": weights}
+
+
+def case_graph(case):
+    """
+    Build the retiming graph of a case
+    :param case: case dictionary
+    :return: directed retiming graph
+    """
+    return RetimingGraph(case["nodes"], case["edges"], case["delays"], case["weights"], positive_cycle_check=False,
+                         remove_clockwise_edges=False).graph
+
+
+def run_case(case):
+    """
+    Run every engine on a case and cross check them: WD backends must return the same matrices, every engine must
+    return the same optimal clock and a legal retiming (non-negative weights) whose clock period is not larger.
+    Failures of KNOWN_DIVERGENT_ENGINES, and their disagreements with the clock of the other engines, go to
+    known_failures instead
+    :param case: case dictionary
+    :return: dictionary with the optimal clock found by each engine, the list of failures and the list of known
+             failures
+    """
+    failures, known_failures, clocks = [], [], {}
+    matrices = {}
+    for method in WD_METHODS:
+        try:
+            matrices[method] = wd_algorithm(case_graph(case), method=method, verbose=False)
+        except Exception as error:
+            failures.append(f"wd {method} raised {error!r}")
+    reference = matrices.get(WD_METHODS[0])
+    for method, (w_mat, d_mat) in matrices.items():
+        if reference is not None and not (np.array_equal(w_mat, reference[0], equal_nan=True)
+                                          and np.array_equal(d_mat, reference[1], equal_nan=True)):
+            failures.append(f"wd {method} matrices differ from {WD_METHODS[0]}")
+
+    for name, engine in ENGINES.items():
+        engine_failures = known_failures if name in KNOWN_DIVERGENT_ENGINES else failures
+        try:
+            G_r, clocks[name] = engine(case_graph(case))
+        except Exception as error:
+            engine_failures.append(f"{name} raised {error!r}")
+            continue
+        clocks[name] = float(clocks[name])
+        if min(nx.get_edge_attributes(G_r, "weight").values(), default=0) < 0:
+            engine_failures.append(f"{name} returned an illegal retiming")
+        elif cp_algorithm(G_r) > clocks[name]:
+            engine_failures.append(f"{name} retimed graph has clock period {cp_algorithm(G_r)} > {clocks[name]}")
+    trusted = {name: clock for name, clock in clocks.items() if name not in KNOWN_DIVERGENT_ENGINES}
+    if len(set(trusted.values())) > 1:
+        failures.append(f"optimal clocks differ: {trusted}")
+    elif trusted:
+        optimal_clock = next(iter(trusted.values()))
+        known_failures.extend(f"{name} clock {clock} differs from {optimal_clock}" for name, clock in clocks.items()
+                              if name in KNOWN_DIVERGENT_ENGINES and clock != optimal_clock)
+    return {"clocks": clocks, "failures": failures, "known_failures": known_failures}
+
+
+def _without_edge(case, index):
+    """
+    Copy of a case without one edge
+    """
+    shrunk = dict(case)
+    shrunk["edges"] = case["edges"][:index] + case["edges"][index + 1:]
+    shrunk["weights"] = case["weights"][:index] + case["weights"][index + 1:]
+    return shrunk
+
+
+def _without_isolated_nodes(case):
+    """
+    Copy of a case without the nodes that have no edges, relabelled to 0, ..., k-1
+    """
+    used = sorted({v for edge in case["edges"] for v in edge})
+    index = {v: i for i, v in enumerate(used)}
+    shrunk = dict(case)
+    shrunk["nodes"] = list(range(len(used)))
+    shrunk["edges"] = [[index[u], index[v]] for u, v in case["edges"]]
+    shrunk["delays"] = [case["delays"][v] for v in used]
+    return shrunk
+
+
+def _is_legal_case(case):
+    """
+    Condition W2 of the paper: the zero-weight subgraph must be acyclic
+    """
+    zero_edges = [edge for edge, weight in zip(case["edges"], case["weights"]) if weight == 0]
+    return nx.is_directed_acyclic_graph(nx.DiGraph(zero_edges))
+
+
+def shrink_case(case, is_failing=lambda case: bool(run_case(case)["failures"])):
+    """
+    Greedily shrink a failing case to a minimal reproducer: drop edges, lower delays and weights one at a time, keeping
+    every change that still fails, until no single change does
+    :param case: failing case dictionary
+    :param is_failing: predicate telling whether a case still fails
+    :return: minimal failing case
+    """
+    progress = True
+    while progress:
+        progress = False
+        for index in reversed(range(len(case["edges"]))):
+            candidate = _without_edge(case, index)
+            if candidate["edges"] and is_failing(candidate):
+                case, progress = candidate, True
+        for key in ["delays", "weights"]:
+            for index, value in enumerate(case[key]):
+                for smaller in sorted({0, value // 2}):
+                    if smaller >= value:
+                        continue
+                    candidate = dict(case)
+                    candidate[key] = case[key][:index] + [smaller] + case[key][index + 1:]
+                    if _is_legal_case(candidate) and is_failing(candidate):
+                        case, progress = candidate, True
+                        break
+    candidate = _without_isolated_nodes(case)
+    return candidate if is_failing(candidate) else case
+
+
+def save_case(case, output_dir):
+    """
+    Atomically save a case as json, so that concurrent fuzzing runs never leave half written reproducers
+    :param case: case dictionary
+    :param output_dir: directory where the case is saved
+    :return: path of the saved file
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{case['family']}_{len(case['nodes'])}_{case['seed']}.json")
+    with tempfile.NamedTemporaryFile("w", dir=output_dir, suffix=".tmp", delete=False) as file:
+        json.dump(case, file, indent=2)
+    os.replace(file.name, path)
+    return path
+
+
+def fuzz(n_cases=100, families=None, n_nodes_list=(4, 8, 16, 32), seed=0, n_jobs=None, output_dir="fuzz_failures",
+         verbose=False):
+    """
+    Differential fuzzing of the retiming engines: seeded cases of every family and size are run on a process pool,
+    failing cases are shrunk and saved to disk
+    :param n_cases: number of cases per family and size
+    :param families: list of families, None for all of FAMILIES
+    :param n_nodes_list: list of graph sizes
+    :param seed: base seed, case i gets seed + i
+    :param n_jobs: number of worker processes, None to use all the CPUs
+    :param output_dir: directory where minimal reproducers are saved
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: list of paths of the saved reproducers
+    """
+    families = list(FAMILIES) if families is None else families
+    cases = [generate_case(family, n_nodes, seed + i) for family in families for n_nodes in n_nodes_list
+             for i in range(n_cases)]
+    saved, n_known = [], 0
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        results = executor.map(run_case, cases, chunksize=max(1, len(cases) // (8 * (n_jobs or os.cpu_count()))))
+        for case, result in zip(cases, results):
+            n_known += bool(result["known_failures"])
+            if not result["failures"]:
+                continue
+            case = shrink_case(case)
+            case["failures"] = run_case(case)["failures"]
+            saved.append(save_case(case, output_dir))
+            if verbose:
+                print(f"Failure on {case['family']} graph with seed {case['seed']}: {case['failures']}")
+    if verbose:
+        print(f"{len(cases)} cases run, {len(saved)} failures saved to {output_dir}, {n_known} cases with known "
+              f"divergences of {', '.join(sorted(KNOWN_DIVERGENT_ENGINES))}")
+    return saved
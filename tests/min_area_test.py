@@ -0,0 +1,110 @@
+import itertools
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.min_area import clock_constraints, critical_path_cuts, min_area_algorithm, min_area_retiming, \
+    min_cost_flow
+from algorithms.wd_algorithm import paper_wd_algorithm
+from tests.differential_fuzzing import case_graph, generate_case
+from retiming.workload_corpus import load_workload
+from tests.paper_test_graphs import get_paper_graphs
+from utils.retiming_utils import compute_retimed_graph
+
+
+def _brute_force_registers(graph, clock, max_shift=5):
+    """
+    Fewest registers of a legal retiming with clock period <= clock, enumerating r(v) - r(0) in [-max_shift, max_shift]
+    """
+    best = None
+    for shifts in itertools.product(range(-max_shift, max_shift + 1), repeat=len(graph) - 1):
+        G_r = compute_retimed_graph(graph, dict(enumerate((0,) + shifts)))
+        weights = [weight for _, _, weight in G_r.edges(data="weight")]
+        if min(weights) >= 0 and cp_algorithm(G_r) <= clock and (best is None or sum(weights) < best):
+            best = sum(weights)
+    return best
+
+
+def test_min_area():
+    """
+    Test minimum area retiming against brute force enumeration for every clock of small random graphs, and on the
+    paper graphs that it reaches the optimal clock with no more registers than OPT1
+    """
+    for seed in range(6):
+        graph = case_graph(generate_case(["gnp", "cyclic", "ring"][seed % 3], 4, seed))
+        _, d_mat = paper_wd_algorithm(graph)
+        for clock in sorted(set(d_mat[d_mat == d_mat])):
+            result = min_area_retiming(graph, clock)
+            assert (result and result[1]) == _brute_force_registers(graph, clock)
+            if result is not None:
+                G_r = compute_retimed_graph(graph, result[0])
+                assert min(weight for _, _, weight in G_r.edges(data="weight")) >= 0 and cp_algorithm(G_r) <= clock
+
+    g1, test1, g2, test2 = get_paper_graphs()
+    for g, test in [(g1, test1), (g2, test2)]:
+        G_r, clock, bellman_ford_registers, registers = min_area_algorithm(g.graph)
+        assert clock == test["opt1"] and cp_algorithm(G_r) == clock
+        assert registers == G_r.size(weight="weight") <= bellman_ford_registers
+
+    g1.graph.add_edge(0, 1, weight=0.5)
+    with pytest.raises(ValueError):
+        clock_constraints(g1.graph, test1["opt1"])
+
+
+def test_min_area_bounded_search():
+    """
+    Test that the critical path cuts make minimum area retiming exact when the searches of clock_constraints are cut
+    short, and that they are valid cuts: violated by the retiming they come from, satisfied by every legal one
+    """
+    graph = load_workload("netlist", 120, seed=1, cache_dir=None).graph
+    _, d_mat = paper_wd_algorithm(graph)
+    clocks = sorted(set(d_mat[d_mat == d_mat]))
+    for clock in clocks[len(clocks) // 4::len(clocks) // 8]:
+        complete = clock_constraints(graph, clock, search_size=None)
+        expected = min_area_retiming(graph, clock, constraints=complete)
+        for search_size in [1, 4, 32]:
+            result = min_area_retiming(graph, clock, constraints=clock_constraints(graph, clock, search_size))
+            assert (result and result[1]) == (expected and expected[1])
+        if expected is None:
+            continue
+        legal = np.array([expected[0][v] for v in range(len(graph))])
+        assert critical_path_cuts(graph, legal, clock) is None
+        retiming = np.zeros(len(graph), dtype=int)
+        cuts = critical_path_cuts(graph, retiming, clock)
+        if cuts is not None:
+            tails, heads, bounds = cuts
+            assert (retiming[tails] - retiming[heads] > bounds).all()
+            assert (legal[tails] - legal[heads] <= bounds).all()
+
+
+def test_min_cost_flow():
+    """
+    Test the primal-dual minimum cost flow against the network simplex of networkx on random instances without
+    negative cycles, and that its potentials are optimal dual variables
+    """
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n_nodes = int(rng.integers(2, 10))
+        G_flow = nx.gnp_random_graph(n_nodes, 0.4, seed=int(rng.integers(1 << 30)), directed=True)
+        if G_flow.number_of_edges() == 0:
+            continue
+        for u, v in G_flow.edges:
+            G_flow[u][v]["weight"] = int(rng.integers(-1, 6))
+        if nx.negative_edge_cycle(G_flow):
+            continue
+        supply = rng.integers(-3, 4, n_nodes)
+        supply[-1] -= supply.sum()
+        nx.set_node_attributes(G_flow, {v: -int(supply[v]) for v in range(n_nodes)}, "demand")
+        try:
+            expected, _ = nx.network_simplex(G_flow)
+        except nx.NetworkXUnfeasible:
+            continue
+        tails, heads = np.array(list(G_flow.edges)).T
+        costs = np.array([G_flow[u][v]["weight"] for u, v in G_flow.edges])
+        flow, potentials = min_cost_flow(n_nodes, tails, heads, costs, supply)
+        reduced = costs + potentials[tails] - potentials[heads]
+        assert costs @ flow == expected and (flow >= 0).all() and (reduced >= 0).all()
+        assert (reduced[flow > 0] == 0).all()
+        assert (np.bincount(tails, flow, n_nodes) - np.bincount(heads, flow, n_nodes) == supply).all()
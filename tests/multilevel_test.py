@@ -0,0 +1,44 @@
+import numpy as np
+
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.multilevel import _coarsen, multilevel_algorithm
+from algorithms.opt2 import opt2_retiming
+from algorithms.path_engines import edge_arrays, node_delays
+from retiming.workload_corpus import load_workload
+from tests.paper_test_graphs import get_paper_graphs
+
+
+def test_multilevel():
+    """
+    Test that coarsening keeps the zero-weight subgraph acyclic and that the multilevel retiming is legal, reaches the
+    clock it reports and lies between the lower bound and the clock period of the graph; on the paper graphs, small
+    enough to be solved without coarsening, it must be optimal
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    for g, test in [(g1, test1), (g2, test2)]:
+        assert multilevel_algorithm(g.graph)[1] == test["opt1"]
+
+    for family in ["netlist", "systolic", "correlator", "ring"]:
+        g = load_workload(family, 120, seed=1, cache_dir=None).graph
+        tails, heads, weights, _ = edge_arrays(g)
+        labels, coarse_tails, coarse_heads, coarse_weights, coarse_delays = _coarsen(len(g), tails, heads, weights,
+                                                                                     node_delays(g))
+        assert coarse_delays.sum() == node_delays(g).sum() and len(coarse_delays) < len(g)
+        # Topological sort of the coarse zero-weight subgraph
+        zero = coarse_weights == 0
+        indegree = np.bincount(coarse_heads[zero], minlength=len(coarse_delays))
+        stack, visited = list(np.flatnonzero(indegree == 0)), 0
+        while stack:
+            v = stack.pop()
+            visited += 1
+            for u in coarse_heads[zero & (coarse_tails == v)]:
+                indegree[u] -= 1
+                if indegree[u] == 0:
+                    stack.append(u)
+        assert visited == len(coarse_delays)
+
+        G_r, clock, lower_bound = multilevel_algorithm(g, coarse_nodes=20)
+        assert min(weight for _, _, weight in G_r.edges(data="weight")) >= 0
+        assert cp_algorithm(G_r) == clock
+        assert opt2_retiming(g, candidates="range")[1] <= clock <= cp_algorithm(g)
+        assert lower_bound == node_delays(g).max()
@@ -1,7 +1,12 @@
 from tests.paper_test_graphs import get_paper_graphs
 from algorithms.opt1 import opt1_algorithm
-from algorithms.opt2 import opt2_algorithm
+from algorithms.opt2 import opt2_algorithm, stream_d_values
+from algorithms.wd_algorithm import wd_algorithm
+import numpy as np
+import pytest
+from algorithms.anytime import anytime_algorithm
 from retiming.RetimingGraphRandom import RetimingGraphRandom
+from tests.differential_fuzzing import KNOWN_DIVERGENT_ENGINES, case_graph, generate_case, run_case
 
 
 def random_test_opt1_opt2(n_tests=1, n_nodes_list=[10, 20, 50, 100, 200, 500], weights="random", verbose=True):
@@ -52,3 +57,65 @@ def test_opt1_2(verbose=False, draw=False):
     _, optimal_clock2_opt2 = opt2_algorithm(g2.graph, draw=draw, verbose=verbose)
     assert optimal_clock2_opt1 == test2["opt1"]
     assert optimal_clock2_opt2 == test2["opt2"]
+
+
+def test_anytime():
+    """
+    Tests the anytime algorithm on paper graphs: with enough time it closes the gap at the OPT2 clock, with an already
+    expired budget it returns the original graph with valid bounds. A zero budget would not do, since FEAS may finish
+    its first round before time() moves past the deadline
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    for g, test in [(g1, test1), (g2, test2)]:
+        _, clock, lower_bound = anytime_algorithm(g.graph, time_budget=60)
+        assert clock == lower_bound == test["opt2"]
+        _, clock, lower_bound = anytime_algorithm(g.graph, time_budget=-1)
+        assert lower_bound <= test["opt2"] <= clock == test["clock_period"]
+
+
+def test_opt2_candidates():
+    """
+    Tests the candidate clocks of OPT2 on paper graphs: streamed D values are the ones of the D matrix, and every
+    candidate generation finds the same optimal clock
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    for g, test in [(g1, test1), (g2, test2)]:
+        _, d_mat = wd_algorithm(g.graph, verbose=False)
+        assert np.array_equal(stream_d_values(g.graph), np.unique(d_mat[~np.isnan(d_mat)]))
+        for candidates in ["stream", "matrix", "range"]:
+            assert opt2_algorithm(g.graph, candidates=candidates)[1] == test["opt2"]
+
+
+def test_opt2_candidates_large_delays(monkeypatch):
+    """
+    Tests that large integer delays stream D values with Dijkstra, whose cost does not grow with the delays, instead
+    of the bucket queues of dial_rows, and that range bisection rejects non integer delays
+    """
+    g1, test1, _, _ = get_paper_graphs()
+    graph = g1.graph.copy()
+    for v in graph.nodes:
+        graph.nodes[v]["delay"] *= 100000
+    monkeypatch.setattr("algorithms.opt2.dial_rows", None)
+    _, d_mat = wd_algorithm(graph, verbose=False)
+    assert np.array_equal(stream_d_values(graph), np.unique(d_mat[~np.isnan(d_mat)]))
+    assert opt2_algorithm(graph)[1] == test1["opt2"] * 100000
+
+    for v in graph.nodes:
+        graph.nodes[v]["delay"] /= 7
+    with pytest.raises(ValueError):
+        opt2_algorithm(graph, candidates="range")
+
+
+def test_opt2_no_feasible_candidate():
+    """
+    Tests a graph where no value of the D matrix of wd_algorithm is a feasible clock: OPT2 falls back to the clock
+    period of the graph instead of searching out of range, and differential fuzzing gives no failure, only the known
+    divergences of the engines reading that D
+    """
+    case = generate_case("cyclic", 16, 2)
+    _, d_mat = wd_algorithm(case_graph(case), verbose=False)
+    assert opt2_algorithm(case_graph(case))[1] == opt2_algorithm(case_graph(case), candidates="range")[1] > \
+        np.nanmax(d_mat)
+    result = run_case(case)
+    assert result["failures"] == [] and result["known_failures"]
+    assert all(failure.split()[0] in KNOWN_DIVERGENT_ENGINES for failure in result["known_failures"])
@@ -0,0 +1,68 @@
+import networkx as nx
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.graph_reduction import expand_retiming, reduce_retiming_graph, reduced_opt_algorithm
+from algorithms.opt1 import opt1_algorithm
+from algorithms.opt2 import opt2_retiming
+from tests.differential_fuzzing import FAMILIES, case_graph, generate_case
+from tests.paper_test_graphs import get_paper_graphs
+from utils.retiming_utils import compute_retimed_graph
+
+
+def _inflate(graph):
+    """
+    Subdivide every edge of a graph with a chain of zero-delay vertices, and add a duplicate path next to it
+    :param graph: directed retiming graph
+    :return: inflated graph, with the same optimal clock
+    """
+    inflated = graph.copy()
+    next_node = len(graph.nodes)
+    for u, v, weight in graph.edges(data="weight"):
+        inflated.remove_edge(u, v)
+        chain = [u] + list(range(next_node, next_node + 3)) + [v]
+        inflated.add_nodes_from(chain[1:-1], delay=0)
+        inflated.add_edge(next_node + 3, v, weight=weight + 1)
+        inflated.add_node(next_node + 3, delay=0)
+        inflated.add_edge(u, next_node + 3, weight=0)
+        for index in range(len(chain) - 1):
+            inflated.add_edge(chain[index], chain[index + 1], weight=weight if index == 1 else 0)
+        next_node += 4
+    return inflated
+
+
+def test_reduction_paper_graphs():
+    """
+    Test that reducing inflated paper graphs gives back graphs no larger than the original ones (the zero-delay host
+    can be a pass-through itself) with the same optimal clock
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    for graph, test in [(g1.graph, test1), (g2.graph, test2)]:
+        inflated = _inflate(graph)
+        reduced, _ = reduce_retiming_graph(inflated)
+        assert len(reduced.nodes) <= len(graph.nodes)
+        assert reduced.number_of_edges() <= graph.number_of_edges()
+
+        G_r, optimal_clock = reduced_opt_algorithm(inflated)
+        assert optimal_clock == test["opt1"] == opt1_algorithm(inflated)[1]
+        assert set(G_r.edges) == set(inflated.edges)
+        assert min(nx.get_edge_attributes(G_r, "weight").values()) >= 0
+        assert cp_algorithm(G_r) <= optimal_clock
+
+
+def test_reduction_guarantees():
+    """
+    Test the guarantees of reduce_retiming_graph on inflated fuzzing graphs: the reduced graph has the optimal clock of
+    the original one, and the expansion of an optimal retiming of the reduced graph is a legal retiming of the
+    original graph with that clock period. The optimum is found with FEAS bisection, which needs no D matrix
+    """
+    for family in FAMILIES:
+        for seed in range(3):
+            graph = _inflate(case_graph(generate_case(family, 8, seed)))
+            reduced, reduction = reduce_retiming_graph(graph)
+            assert len(reduced.nodes) < len(graph.nodes)
+            retiming, optimal_clock = opt2_retiming(reduced, candidates="range")
+            assert optimal_clock == opt2_retiming(graph, candidates="range")[1]
+
+            G_r = compute_retimed_graph(graph, expand_retiming(reduction, retiming))
+            assert set(G_r.edges) == set(graph.edges)
+            assert min(nx.get_edge_attributes(G_r, "weight").values()) >= 0
+            assert cp_algorithm(G_r) == optimal_clock
@@ -0,0 +1,26 @@
+import matplotlib.pyplot as plt
+from algorithms.opt1 import opt1_algorithm
+from retiming.workload_corpus import load_workload
+from tests.paper_test_graphs import get_paper_graphs
+from utils.retiming_utils import collapse_retiming_graph, render_retiming_graph, render_retiming_graphs
+
+
+def test_render(tmp_path):
+    """
+    Test headless rendering: the paper graph and its retimed version share the layout, a large graph is collapsed
+    in every mode, and no figure is left open
+    """
+    g1, _, _, _ = get_paper_graphs()
+    G_r, _ = opt1_algorithm(g1.graph)
+    layout_cache = {}
+    paths = render_retiming_graphs({"original": g1.graph, "retimed": G_r}, tmp_path, fmt="svg",
+                                   layout_cache=layout_cache)
+    assert all(path.exists() for path in map(type(tmp_path), paths.values()))
+    assert set(layout_cache) == set(g1.graph.nodes)
+
+    g = load_workload("netlist", 1000, cache_dir=None)
+    for mode in ["critical", "scc", "sample"]:
+        assert len(collapse_retiming_graph(g.graph, mode=mode, max_nodes=50).nodes) <= 50
+        render_retiming_graph(g.graph, str(tmp_path / f"{mode}.png"), mode=mode, max_nodes=50)
+        assert (tmp_path / f"{mode}.png").exists()
+    assert not plt.get_fignums()
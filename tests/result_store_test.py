@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+
+from algorithms.opt1 import opt1_retiming
+from algorithms.wd_algorithm import wd_algorithm
+from tests.paper_test_graphs import get_paper_graphs
+from utils.result_store import ResultStore, cached_opt_algorithm, graph_key
+
+
+def test_result_store_round_trip(tmp_path, monkeypatch):
+    """
+    Test that a stored result is read back identical, with and without W and D, and that a changed graph or
+    parameter is a miss
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    store = ResultStore(str(tmp_path))
+    w_mat, d_mat = wd_algorithm(g1.graph, verbose=False)
+    retiming, clock = opt1_retiming(g1.graph, w_mat=w_mat, d_mat=d_mat)
+
+    key = graph_key(g1.graph, "opt1")
+    assert store.get(key) is None
+    store.put(key, retiming, clock, w_mat=w_mat, d_mat=d_mat)
+    result = store.get(key)
+    assert result["retiming"] == retiming and result["optimal_clock"] == clock == test1["opt1"]
+    assert np.array_equal(result["w_mat"], w_mat, equal_nan=True)
+    assert np.array_equal(result["d_mat"], d_mat, equal_nan=True)
+
+    key_no_matrices = graph_key(g1.graph, "opt1", store_matrices=False)
+    store.put(key_no_matrices, retiming, clock)
+    assert "w_mat" not in store.get(key_no_matrices)
+
+    # Misses: another algorithm or parameter, an edited graph
+    assert store.get(graph_key(g1.graph, "opt2")) is None
+    assert store.get(graph_key(g1.graph, "opt1", tolerance=1)) is None
+    edited = g1.graph.copy()
+    u, v = next(iter(edited.edges))
+    edited.edges[u, v]["weight"] += 1
+    assert store.get(graph_key(edited, "opt1")) is None
+    assert graph_key(g2.graph, "opt1") != key
+
+    # The cached engine returns the stored result without solving
+    assert cached_opt_algorithm(g1.graph, store)[1] == test1["opt1"]
+
+    # OPT2 streams its candidate clocks and only computes W and D when they have to be stored
+    monkeypatch.setattr("utils.result_store.wd_algorithm", None)
+    assert cached_opt_algorithm(g2.graph, store, algorithm="opt2")[1] == test2["opt2"]
+    assert "w_mat" not in store.get(graph_key(g2.graph, "opt2"))
+
+
+def test_result_store_eviction(tmp_path):
+    """
+    Test that the least recently used results are evicted when the store exceeds max_bytes
+    """
+    g1, _, _, _ = get_paper_graphs()
+    store = ResultStore(str(tmp_path), max_bytes=10 ** 9)
+    keys = [graph_key(g1.graph, "opt1", index=i) for i in range(4)]
+    retiming = {v: 0 for v in g1.graph.nodes}
+    for i, key in enumerate(keys):
+        store.put(key, retiming, float(i))
+        os.utime(store._path(key), (i, i))
+    # Reading the oldest result makes it the most recently used one
+    assert store.get(keys[0]) is not None
+    size = os.path.getsize(store._path(keys[0]))
+    store.max_bytes = 2 * size
+    store.put(graph_key(g1.graph, "opt1", index=4), retiming, 4.0)
+    remaining = [key for key in keys if store.get(key) is not None]
+    assert remaining == [keys[0]]
+
+
+def test_result_store_corrupt_files(tmp_path):
+    """
+    Test that truncated, corrupted or incomplete files are misses instead of errors
+    """
+    g1, _, _, _ = get_paper_graphs()
+    store = ResultStore(str(tmp_path))
+    key = graph_key(g1.graph, "opt1")
+    store.put(key, {v: 0 for v in g1.graph.nodes}, 1.0)
+    path = store._path(key)
+    with open(path, "rb") as file:
+        content = file.read()
+    with open(path, "wb") as file:
+        file.write(content[:len(content) // 2])
+    assert store.get(key) is None
+    with open(path, "wb") as file:
+        file.write(b"not a zip file")
+    assert store.get(key) is None
+    np.savez(path, nodes=np.arange(3))
+    assert store.get(key) is None
+
+
+def test_result_store_stale_temporaries(tmp_path):
+    """
+    Test that temporary files left by dead writers are removed when the store is opened and at eviction, while recent
+    ones, possibly being written, are kept
+    """
+    g1, _, _, _ = get_paper_graphs()
+    stale, recent = os.path.join(tmp_path, "stale.tmp"), os.path.join(tmp_path, "recent.tmp")
+    for path in [stale, recent]:
+        with open(path, "wb") as file:
+            file.write(b"partial")
+    os.utime(stale, (0, 0))
+    store = ResultStore(str(tmp_path))
+    assert not os.path.exists(stale) and os.path.exists(recent)
+
+    os.utime(recent, (0, 0))
+    store.put(graph_key(g1.graph, "opt1"), {v: 0 for v in g1.graph.nodes}, 1.0)
+    assert not os.path.exists(recent)
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
@@ -0,0 +1,51 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from algorithms.cp_algorithm import cp_algorithm, delta_array
+from algorithms.opt1 import opt1_retiming
+from retiming.RetimedGraphView import RetimedGraphView
+from retiming.workload_corpus import load_workload
+from tests.paper_test_graphs import get_paper_graphs
+from utils.retiming_utils import compute_retimed_graph
+
+
+def test_retimed_graph_view():
+    """
+    Test that a RetimedGraphView gives the same weights, delta array and clock period as the materialized retimed
+    graph, for the zero retiming, optimal retimings and random (also illegal) ones, and the error on a cycle with 0
+    weight
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    graphs = [g1.graph, g2.graph] + [load_workload(family, 30, seed=1, cache_dir=None).graph
+                                     for family in ["ring", "netlist", "systolic"]]
+    rng = np.random.default_rng(0)
+    for g in graphs:
+        view = RetimedGraphView(g)
+        retimings = [None, opt1_retiming(g)[0]] + [dict(enumerate(rng.integers(-1, 2, size=len(g)).tolist()))
+                                                   for _ in range(5)]
+        for retiming in retimings:
+            G_r = compute_retimed_graph(g, retiming or {v: 0 for v in g.nodes})
+            retimed_view = view.with_retiming(retiming)
+            assert retimed_view.tails is view.tails
+            materialized = retimed_view.materialize()
+            assert nx.utils.edges_equal(materialized.edges(data=True), G_r.edges(data=True))
+            assert dict(materialized.nodes(data=True)) == dict(G_r.nodes(data=True))
+            assert retimed_view.registers == G_r.size(weight="weight")
+            assert retimed_view.is_legal == (min(w for _, _, w in G_r.edges(data="weight")) >= 0)
+            # Edges read as networkx edges
+            edges = retimed_view.edges
+            assert len(edges) == G_r.number_of_edges() and set(edges) == set(G_r.edges)
+            assert nx.utils.edges_equal(edges(data=True), G_r.edges(data=True))
+            assert edges(data="weight") == [(u, v, G_r.edges[u, v]["weight"]) for u, v in edges]
+            assert all((u, v) in edges and edges[u, v] == G_r.edges[u, v] for u, v in G_r.edges)
+            assert (len(g), len(g)) not in edges
+            assert delta_array(retimed_view) == delta_array(G_r)
+            assert cp_algorithm(retimed_view) == cp_algorithm(G_r)
+
+    # A cycle with 0 weight makes the delta array unbounded, with either representation
+    g = nx.DiGraph()
+    g.add_nodes_from([(0, {"delay": 1}), (1, {"delay": 2})])
+    g.add_weighted_edges_from([(0, 1, 0), (1, 0, 0)])
+    with pytest.raises(nx.NetworkXUnfeasible):
+        delta_array(RetimedGraphView(g))
@@ -0,0 +1,49 @@
+import networkx as nx
+import numpy as np
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.opt1 import opt1_algorithm
+from algorithms.opt2 import opt2_algorithm
+from algorithms.scc_decomposition import scc_opt_algorithm
+from retiming.RetimingGraphRandom import RetimingGraphRandom
+from tests.paper_test_graphs import get_paper_graphs
+
+
+def _check_scc_retiming(graph, algorithm, n_jobs=1):
+    """
+    Check that SCC decomposed retiming finds the same clock as the monolithic algorithm, with a legal retiming
+    :param graph: directed retiming graph
+    :param algorithm: 'opt1' | 'opt2'
+    :param n_jobs: number of worker processes
+    """
+    G_r, optimal_clock = scc_opt_algorithm(graph, algorithm=algorithm, n_jobs=n_jobs)
+    monolithic = opt1_algorithm if algorithm == "opt1" else opt2_algorithm
+    assert optimal_clock == monolithic(graph)[1]
+    assert min(nx.get_edge_attributes(G_r, "weight").values()) >= 0
+    assert cp_algorithm(G_r) <= optimal_clock
+
+
+def test_scc_paper_graphs():
+    """
+    Test SCC decomposition on Leierson - Saxe paper and on Jiang's slides graphs, both a single component
+    """
+    g1, test1, g2, test2 = get_paper_graphs()
+    assert scc_opt_algorithm(g1.graph)[1] == test1["opt1"]
+    assert scc_opt_algorithm(g2.graph, algorithm="opt2")[1] == test2["opt2"]
+
+
+def test_scc_random_graphs():
+    """
+    Test SCC decomposition on random graphs, and on paper graphs joined by feed-forward edges to get several components
+    """
+    np.random.seed(2)
+    for n_nodes in [8, 12, 20]:
+        _check_scc_retiming(RetimingGraphRandom(n_nodes, edge_probability=0.5, weights="positive").graph, "opt1")
+
+    g1, _, g2, _ = get_paper_graphs()
+    union = nx.disjoint_union(g1.graph, g2.graph)
+    union.add_edge(7, 9, weight=0)
+    union.add_edge(3, 11, weight=2)
+    union.add_node(12, delay=5)
+    union.add_edge(11, 12, weight=0)
+    _check_scc_retiming(union, "opt1", n_jobs=2)
+    _check_scc_retiming(union, "opt2")
@@ -0,0 +1,71 @@
+import numpy as np
+from algorithms.cp_algorithm import cp_algorithm
+from algorithms.opt1 import opt1_algorithm
+from algorithms.wd_algorithm import wd_algorithm
+from retiming.RetimingGraphRandom import RetimingGraphRandom
+from retiming.RetimingSession import RetimingSession
+from tests.paper_test_graphs import get_paper_graphs
+
+
+def _check_session(session):
+    """
+    Check the incremental W, D and optimal clock of a session against a computation from scratch, and the retiming
+    found by the warm started search
+    :param session: RetimingSession object
+    """
+    w_mat, d_mat = wd_algorithm(session.graph.copy(), verbose=False)
+    assert np.array_equal(session.w_mat, w_mat, equal_nan=True)
+    assert np.array_equal(session.d_mat, d_mat, equal_nan=True)
+    G_r, clock = session.optimize()
+    assert clock == opt1_algorithm(session.graph.copy())[1]
+    # The warm started retiming is legal and reaches the clock
+    assert min(weight for _, _, weight in G_r.edges(data="weight")) >= 0 and cp_algorithm(G_r) <= clock
+
+
+def test_session_paper_graph():
+    """
+    Test a sequence of edits on Leierson - Saxe paper graph
+    """
+    g1, test1, _, _ = get_paper_graphs()
+    session = RetimingSession(g1)
+    assert session.optimize()[1] == test1["opt1"]
+
+    session.set_delay(5, 3)
+    _check_session(session)
+    session.set_delay(1, 9)
+    _check_session(session)
+    session.set_weight(0, 1, 3)
+    _check_session(session)
+    session.remove_edge(2, 6)
+    _check_session(session)
+    session.add_edge(4, 7, 0)
+    _check_session(session)
+    session.set_weight(0, 1, 1)
+    _check_session(session)
+
+
+def test_session_random_edits(n_edits=30):
+    """
+    Test random edits on a random graph
+    :param n_edits: number of random edits
+    """
+    np.random.seed(1)
+    g = RetimingGraphRandom(15, edge_probability=0.3, weights="positive")
+    session = RetimingSession(g)
+    session.optimize()
+    for _ in range(n_edits):
+        edit = np.random.randint(4)
+        edges = list(session.graph.edges)
+        if edit == 0:
+            session.set_delay(np.random.randint(15), np.random.randint(10))
+        elif edit == 1 and edges:
+            u, v = edges[np.random.randint(len(edges))]
+            session.set_weight(u, v, np.random.randint(1, 4))
+        elif edit == 2 and len(edges) > 15:
+            u, v = edges[np.random.randint(len(edges))]
+            session.remove_edge(u, v)
+        else:
+            u, v = sorted(np.random.choice(15, size=2, replace=False))
+            if not session.graph.has_edge(u, v):
+                session.add_edge(u, v, np.random.randint(1, 3))
+        _check_session(session)
@@ -0,0 +1,21 @@
+from algorithms.opt2 import opt2_algorithm
+from profilers.stage_profiler import STAGES, StageProfiler
+from retiming.workload_corpus import load_workload
+
+
+def test_stage_profiler(tmp_path):
+    """
+    Test the sampling profiler on OPT2: samples are tagged with the algorithm stages and saved as collapsed stacks
+    """
+    g = load_workload("correlator", 60, cache_dir=None)
+    with StageProfiler(interval=0.001) as profiler:
+        opt2_algorithm(g.graph)
+    assert sum(profiler.stacks.values()) > 0
+    assert set(profiler.stage_samples()) <= set(STAGES) | {"other"}
+    assert {"feas_algorithm", "compute_retimed_graph", "delta_array"} & set(profiler.stage_samples())
+
+    folded_path, report_path = profiler.save(tmp_path, name="opt2")
+    with open(folded_path) as file:
+        for line in file.read().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert stack.split(";")[0] in profiler.stage_samples() and int(count) > 0
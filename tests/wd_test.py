@@ -0,0 +1,38 @@
+import numpy as np
+from algorithms.wd_algorithm import wd_algorithm
+from retiming.RetimingGraphRandom import RetimingGraphRandom
+from tests.paper_test_graphs import get_paper_graphs
+
+
+def _assert_same_matrices(graph, methods):
+    """
+    Check that every WD backend in methods returns the same W and D matrices as the Dijkstra one
+    :param graph: directed retiming graph
+    :param methods: list of wd_algorithm methods to compare
+    """
+    w_ref, d_ref = wd_algorithm(graph, method="dijkstra", verbose=False)
+    for method in methods:
+        w_mat, d_mat = wd_algorithm(graph, method=method, verbose=False)
+        assert np.array_equal(w_mat, w_ref, equal_nan=True)
+        assert np.array_equal(d_mat, d_ref, equal_nan=True)
+
+
+def test_wd_backends(methods=("floyd_warshall", "dial", "auto")):
+    """
+    Test that all WD backends agree on paper graphs and on random graphs of different densities
+    :param methods: list of wd_algorithm methods to compare with Dijkstra
+    """
+    g1, _, g2, _ = get_paper_graphs()
+    _assert_same_matrices(g1.graph, methods)
+    _assert_same_matrices(g2.graph, methods)
+
+    np.random.seed(0)
+    for n_nodes, edge_probability, weights in [(30, 0.6, "positive"), (70, 0.05, "positive"), (12, 0.4, "random")]:
+        valid_graph = False
+        while not valid_graph:
+            try:
+                g = RetimingGraphRandom(n_nodes, edge_probability=edge_probability, max_weight=3, weights=weights)
+                valid_graph = True
+            except AssertionError:
+                pass
+        _assert_same_matrices(g.graph, methods)
@@ -0,0 +1,72 @@
+import os
+
+import networkx as nx
+import numpy as np
+
+from algorithms.path_engines import edge_arrays, node_delays, zero_weight_paths
+from retiming.workload_corpus import WORKLOAD_FAMILIES, correlator_workload, load_workload, workload_graph
+from tests.paper_test_graphs import get_paper_graphs
+
+
+def test_correlator_workload():
+    """
+    Test that the correlator family with 8 nodes is the correlator of the Leiserson - Saxe paper, delays and weights
+    included
+    """
+    g1, _, _, _ = get_paper_graphs()
+    G = workload_graph(correlator_workload(8)).graph
+    assert nx.is_isomorphic(G, g1.graph, node_match=lambda a, b: a["delay"] == b["delay"],
+                            edge_match=lambda a, b: a["weight"] == b["weight"])
+
+
+def test_workload_families():
+    """
+    Test that every family is deterministic for a seed, that the random families change with the seed, and that every
+    graph satisfies W1 (non-negative delays and weights) and W2 (no zero-weight cycle)
+    """
+    for family, generator in WORKLOAD_FAMILIES.items():
+        for n_nodes in [10, 257]:
+            workload = generator(n_nodes, seed=1)
+            same = generator(n_nodes, seed=1)
+            assert all(np.array_equal(workload[key], same[key]) for key in workload)
+            other = generator(n_nodes, seed=2)
+            changed = any(not np.array_equal(workload[key], other[key]) for key in workload)
+            assert changed == (family != "correlator")
+
+            G = workload_graph(workload).graph
+            tails, heads, weights, _ = edge_arrays(G)
+            assert (weights >= 0).all() and (node_delays(G) >= 0).all()
+            # Raises ValueError on a zero-weight cycle
+            zero_weight_paths(len(G), tails, heads, weights, np.ones(len(G)))
+
+
+def test_load_workload_cache(tmp_path):
+    """
+    Test that a workload read back from the .npz cache gives the same graph as the generated one
+    """
+    for family in WORKLOAD_FAMILIES:
+        generated = load_workload(family, 50, seed=3, cache_dir=tmp_path).graph
+        assert os.path.exists(os.path.join(tmp_path, f"{family}_50_3.npz"))
+        cached = load_workload(family, 50, seed=3, cache_dir=tmp_path).graph
+        assert nx.utils.graphs_equal(generated, cached)
+        assert nx.utils.graphs_equal(generated, load_workload(family, 50, seed=3, cache_dir=None).graph)
+
+
+def test_load_workload_corrupt_cache(tmp_path):
+    """
+    Test that truncated, foreign or incomplete cache files are regenerated instead of crashing the load
+    """
+    expected = load_workload("netlist", 50, seed=3, cache_dir=None).graph
+    path = os.path.join(tmp_path, "netlist_50_3.npz")
+    load_workload("netlist", 50, seed=3, cache_dir=tmp_path)
+    with open(path, "rb") as file:
+        content = file.read()
+    for corrupted in [content[:len(content) // 2], b"not a zip file"]:
+        with open(path, "wb") as file:
+            file.write(corrupted)
+        assert nx.utils.graphs_equal(load_workload("netlist", 50, seed=3, cache_dir=tmp_path).graph, expected)
+    np.savez(path, delays=np.arange(3))
+    assert nx.utils.graphs_equal(load_workload("netlist", 50, seed=3, cache_dir=tmp_path).graph, expected)
+    # The corrupted file was overwritten with the regenerated workload
+    with np.load(path) as data:
+        assert sorted(data.files) == ["delays", "heads", "tails", "weights"]
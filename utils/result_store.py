@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+from algorithms.opt1 import opt1_retiming
+from algorithms.opt2 import opt2_retiming
+from algorithms.wd_algorithm import wd_algorithm
+from utils.retiming_utils import compute_retimed_graph, draw_retiming_graph
+
+# Age in seconds after which a temporary file is considered left behind by a dead writer
+STALE_TEMPORARY_SECONDS = 3600
+
+
+def graph_key(graph, algorithm, **parameters):
+    """
+    Content hash of a retiming graph and of the algorithm parameters: two graphs with the same nodes, delays, edges
+    and weights get the same key whatever the order they were built in
+    :param graph: directed retiming graph
+    :param algorithm: name of the algorithm
+    :param parameters: any other parameter that changes the result
+    :return: hexadecimal sha256 key
+    """
+    content = {
+        "nodes": sorted([int(v), float(delay)] for v, delay in graph.nodes(data="delay")),
+        "edges": sorted([int(u), int(v), float(weight)] for u, v, weight in graph.edges(data="weight")),
+        "algorithm": algorithm,
+        "parameters": {name: repr(value) for name, value in sorted(parameters.items())},
+    }
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+
+class ResultStore:
+    def __init__(self, directory=".retiming_store", max_bytes=2 ** 30):
+        """
+        Persistent, content addressed store of solved retimings: one .npz file per key holding the retiming vector,
+        the optimal clock and optionally the W and D matrices. Writes go to a temporary file renamed over the final
+        one, so concurrent workers never read a partial result, and the least recently used results are evicted
+        when the store grows over max_bytes. Temporary files older than STALE_TEMPORARY_SECONDS, left by writers that
+        died before the rename, are removed when the store is opened and at every eviction
+        :param directory: directory of the store, created if missing
+        :param max_bytes: maximum total size of the stored results
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._remove_stale_temporaries()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Look up a result
+        :param key: key from graph_key
+        :return: dictionary with 'retiming', 'optimal_clock' and, if stored, 'w_mat' and 'd_mat'; None if missing
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                result = {"retiming": dict(zip(data["nodes"].tolist(), data["retiming"].tolist())),
+                          "optimal_clock": data["optimal_clock"].item()}
+                if "w_mat" in data:
+                    result["w_mat"], result["d_mat"] = data["w_mat"], data["d_mat"]
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # Missing, truncated or corrupted, or evicted by another worker meanwhile
+            return None
+        try:
+            # Refresh the access time used by the eviction policy
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker after the read, the result is still valid
+            pass
+        return result
+
+    def put(self, key, retiming, optimal_clock, w_mat=None, d_mat=None):
+        """
+        Atomically store a result, then evict old results if needed
+        :param key: key from graph_key
+        :param retiming: retiming dictionary
+        :param optimal_clock: optimal clock period
+        :param w_mat: W matrix, optional
+        :param d_mat: D matrix, optional
+        """
+        arrays = {"nodes": np.array(list(retiming.keys())), "retiming": np.array(list(retiming.values())),
+                  "optimal_clock": np.array(optimal_clock)}
+        if w_mat is not None and d_mat is not None:
+            arrays["w_mat"], arrays["d_mat"] = w_mat, d_mat
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as file:
+            np.savez(file, **arrays)
+        os.replace(file.name, self._path(key))
+        self._evict()
+
+    def _remove_stale_temporaries(self):
+        """
+        Remove the temporary files of writers that died before renaming them. Recent ones may belong to a write in
+        progress and are kept
+        """
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".tmp"):
+                continue
+            try:
+                if now - entry.stat().st_mtime > STALE_TEMPORARY_SECONDS:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                # Renamed or removed by another worker meanwhile
+                pass
+
+    def _evict(self):
+        """
+        Remove stale temporary files, and the least recently used results until the store fits in max_bytes
+        """
+        self._remove_stale_temporaries()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def cached_opt_algorithm(graph, store, algorithm="opt1", store_matrices=False, draw=False, verbose=False):
+    """
+    OPT1 / OPT2 with a lookup in a ResultStore before solving, and the result saved after a miss. The W and D matrices
+    are only computed when OPT1 needs them or they have to be stored: otherwise OPT2 streams its candidate clocks in
+    O(V + E) memory
+    :param graph: directed retiming graph
+    :param store: ResultStore object
+    :param algorithm: 'opt1' | 'opt2'
+    :param store_matrices: True to also store the W and D matrices
+    :param draw: True if we want to draw the retimed graph
+    :param verbose: True  [False] to enable [disable] verbosity
+    :return: retimed graph and optimal clock
+    """
+    if algorithm not in ("opt1", "opt2"):
+        raise ValueError("algorithm can be either 'opt1' or 'opt2'")
+    key = graph_key(graph, algorithm)
+    result = store.get(key)
+    if result is not None:
+        if verbose:
+            print(f"Found stored result {key}")
+        retiming, optimal_clock = result["retiming"], result["optimal_clock"]
+    else:
+        w_mat, d_mat = wd_algorithm(graph, verbose=verbose) if store_matrices or algorithm == "opt1" else (None, None)
+        if algorithm == "opt1":
+            retiming, optimal_clock = opt1_retiming(graph, w_mat=w_mat, d_mat=d_mat, verbose=verbose)
+        else:
+            retiming, optimal_clock = opt2_retiming(graph, d_mat=d_mat, verbose=verbose)
+        if store_matrices:
+            store.put(key, retiming, optimal_clock, w_mat=w_mat, d_mat=d_mat)
+        else:
+            store.put(key, retiming, optimal_clock)
+    G_r = compute_retimed_graph(graph, retiming)
+    if draw:
+        draw_retiming_graph(G_r)
+    return G_r, optimal_clock
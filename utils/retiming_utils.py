@@ -1,12 +1,29 @@
+import os
+
 import networkx as nx
 import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+__all__ = ["draw_retiming_graph", "plot_dictionary", "compute_retimed_graph", "collapse_retiming_graph",
+           "render_retiming_graph", "render_retiming_graphs", "RENDER_MAX_NODES", "RENDER_MAX_EDGE_LABELS"]
 
+# Graphs with more nodes than this are collapsed before rendering
+RENDER_MAX_NODES = 200
+# Edge labels are drawn only up to this number of edges
+RENDER_MAX_EDGE_LABELS = 300
 
-def draw_retiming_graph(graph):
+
+def draw_retiming_graph(graph, path=None):
     """
     Draws retiming graph alongside edges weights and node delay
     :param graph: graph to draw
+    :param path: if given, the graph is rendered headless to this file with render_retiming_graph instead of shown
     """
+    if path is not None:
+        render_retiming_graph(graph, path)
+        return
     pos = nx.shell_layout(graph)
 
     delay = nx.get_node_attributes(graph, 'delay')
@@ -46,3 +63,127 @@ def compute_retimed_graph(graph, retiming, draw=False):
     if draw:
         draw_retiming_graph(G_r)
     return G_r
+
+
+def _critical_subgraph(graph, max_nodes):
+    """
+    Subgraph of the critical zero-weight paths: starting from the vertices with the largest delta, walk back along the
+    zero-weight edges that realize delta(v) = d(v) + delta(u), until max_nodes vertices are collected
+    """
+    # Imported here, the algorithms package depends on utils and not the other way around
+    from algorithms.cp_algorithm import delta_array
+
+    delta = delta_array(graph)
+    delays = nx.get_node_attributes(graph, "delay")
+    nodes = set()
+    for v in sorted(delta, key=delta.get, reverse=True):
+        while v is not None and v not in nodes and len(nodes) < max_nodes:
+            nodes.add(v)
+            v = next((u for u, _, weight in graph.in_edges(v, data="weight")
+                      if weight == 0 and delta[u] == delta[v] - delays[v]), None)
+        if len(nodes) >= max_nodes:
+            break
+    return graph.subgraph(nodes)
+
+
+def _scc_condensation(graph, max_nodes):
+    """
+    Condensation of the strongly connected components: every component becomes a node 'sccK' whose delay is the sum
+    of the delays of its vertices, every cross edge keeps the minimum weight between the two components. Only the
+    max_nodes largest components are kept
+    """
+    sccs = sorted(nx.strongly_connected_components(graph), key=len, reverse=True)[:max_nodes]
+    component = {v: f"scc{k}" for k, scc in enumerate(sccs) for v in scc}
+    delays = nx.get_node_attributes(graph, "delay")
+    collapsed = nx.DiGraph()
+    collapsed.add_nodes_from((f"scc{k}", {"delay": sum(delays[v] for v in scc)}) for k, scc in enumerate(sccs))
+    for u, v, weight in graph.edges(data="weight"):
+        cu, cv = component.get(u), component.get(v)
+        if cu is None or cv is None or cu == cv:
+            continue
+        if not collapsed.has_edge(cu, cv) or weight < collapsed[cu][cv]["weight"]:
+            collapsed.add_edge(cu, cv, weight=weight)
+    return collapsed
+
+
+def collapse_retiming_graph(graph, mode="critical", max_nodes=RENDER_MAX_NODES, seed=0):
+    """
+    Reduce a large retiming graph to something that can be drawn
+    :param graph: directed retiming graph
+    :param mode: 'critical' to keep the critical zero-weight paths, 'scc' to draw the condensation of the largest
+                 strongly connected components, 'sample' to keep a random sample of the nodes
+    :param max_nodes: maximum number of nodes kept
+    :param seed: random seed of 'sample'
+    :return: graph to draw
+    """
+    if mode == "critical":
+        return _critical_subgraph(graph, max_nodes)
+    if mode == "scc":
+        return _scc_condensation(graph, max_nodes)
+    if mode == "sample":
+        nodes = list(graph.nodes)
+        sample = np.random.default_rng(seed).choice(len(nodes), size=min(max_nodes, len(nodes)), replace=False)
+        return graph.subgraph(nodes[i] for i in sample)
+    raise ValueError("mode can be one of 'critical', 'scc' or 'sample'")
+
+
+def render_retiming_graph(graph, path, layout_cache=None, mode="critical", max_nodes=RENDER_MAX_NODES, title=None,
+                          figsize=(12, 12)):
+    """
+    Headless rendering of a retiming graph to a file, the format (png, svg, pdf, ...) is given by the extension.
+    It draws on a figure detached from pyplot, so it runs without a display and no figure is left open.
+    Graphs larger than max_nodes are first collapsed with collapse_retiming_graph. Node positions are read from and
+    saved to layout_cache, so that an original graph and its retimed versions (same nodes) share the same layout and
+    only new nodes are laid out, around the cached ones
+    :param graph: directed retiming graph
+    :param path: output file
+    :param layout_cache: dictionary {node: position} shared across calls, None to not cache
+    :param mode: collapse mode for large graphs, see collapse_retiming_graph
+    :param max_nodes: size above which the graph is collapsed
+    :param title: figure title
+    :param figsize: figure size in inches
+    :return: path
+    """
+    if len(graph.nodes) > max_nodes:
+        graph = collapse_retiming_graph(graph, mode=mode, max_nodes=max_nodes)
+    layout_cache = {} if layout_cache is None else layout_cache
+    known = [v for v in graph.nodes if v in layout_cache]
+    if len(known) < len(graph.nodes):
+        if not known and len(graph.nodes) <= 50:
+            pos = nx.shell_layout(graph)
+        else:
+            pos = nx.spring_layout(graph, pos={v: layout_cache[v] for v in known} or None, fixed=known or None,
+                                   seed=0)
+        layout_cache.update(pos)
+    pos = {v: layout_cache[v] for v in graph.nodes}
+
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.set_axis_off()
+    if title is not None:
+        ax.set_title(title)
+    nx.draw_networkx(graph, pos, ax=ax, labels=nx.get_node_attributes(graph, "delay"), font_weight="bold",
+                     node_size=300 if len(graph.nodes) <= 50 else 60, font_size=10 if len(graph.nodes) <= 50 else 6)
+    if graph.number_of_edges() <= RENDER_MAX_EDGE_LABELS:
+        nx.draw_networkx_edge_labels(graph, pos, ax=ax, edge_labels=nx.get_edge_attributes(graph, "weight"),
+                                     font_size=10 if len(graph.nodes) <= 50 else 6)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    figure.savefig(path)
+    return path
+
+
+def render_retiming_graphs(graphs, output_dir, fmt="png", **kwargs):
+    """
+    Batch rendering of many retiming graphs, e.g. an original graph and its retimed versions, with a shared layout
+    cache
+    :param graphs: dictionary {name: graph}
+    :param output_dir: output directory
+    :param fmt: file format, png | svg | pdf
+    :param kwargs: other arguments of render_retiming_graph
+    :return: dictionary {name: path}
+    """
+    layout_cache = kwargs.pop("layout_cache", {})
+    return {name: render_retiming_graph(graph, os.path.join(output_dir, f"{name}.{fmt}"), layout_cache=layout_cache,
+                                        title=name, **kwargs)
+            for name, graph in graphs.items()}